@@ -0,0 +1,382 @@
+"""
+Change scan across many short codes at once.
+
+compare_batch() loads the requested records in one store pass and a feeder thread
+spreads them over per-origin-host backlogs. Each host's backlog is drained over one
+pooled httpx.Client by a few "lanes" (at most the outbound scheduler's per-host cap, so
+a big batch never overflows the per-host queue); lanes of all hosts share `concurrency`
+threads and are fed continuously, so a slow host only ties up its own lanes. At most
+MAX_PENDING records are read ahead of their results. Normalization and diffing run in
+a process pool so BeautifulSoup parsing is not serialized on the GIL. Results are
+yielded as they complete.
+
+CLI equivalent (NDJSON to stdout):
+  python -m src.api.compare_batch CODE [CODE ...]
+  python -m src.api.compare_batch --content-type text/html --archived-after 2024-01-01
+  python -m src.api.compare_batch --codes-file codes.txt --concurrency 32
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from . import outbound, services
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Records read ahead of their results; bounds memory when scanning by filter over the whole store.
+MAX_PENDING = 1000
+# Records a lane handles before handing its thread to lanes queued behind it.
+LANE_TURN = 8
+# Idle hosts' clients are closed once a run has this many open.
+MAX_CLIENTS = 256
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _default_concurrency() -> int:
+    return outbound._env_int("COMPARE_BATCH_CONCURRENCY", 16, minimum=1)
+
+
+def _parse_workers() -> int:
+    return outbound._env_int("COMPARE_PARSE_WORKERS", min(4, os.cpu_count() or 1), minimum=0)
+
+
+def _max_concurrency() -> int:
+    """Batch fetches may hold at most half the scheduler's global slots; the rest stay free for interactive requests."""
+    return max(1, outbound.get_scheduler().max_global // 2)
+
+
+# PUBLIC_INTERFACE
+def check_config() -> None:
+    """Validate the COMPARE_* env vars (RuntimeError if malformed); the app lifespan calls this at startup."""
+    _default_concurrency()
+    _parse_workers()
+
+
+def _get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared normalize/diff worker pool, started on first use (spawned workers import only services)."""
+    global _parse_pool
+    workers = _parse_workers()
+    if workers <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    return _parse_pool
+
+
+def _discard_parse_pool(broken: ProcessPoolExecutor) -> None:
+    """Forget a pool whose worker died, so the next _get_parse_pool() starts a fresh one."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is broken:
+            _parse_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _normalize_and_diff(use_processes: bool, archived: str, raw: str, content_type: str) -> Any:
+    """services.normalize_and_diff on the shared parse pool (or inline), surviving a dead worker."""
+    for attempt in range(2):
+        pool = _get_parse_pool() if use_processes else None
+        if pool is None:
+            return services.normalize_and_diff(archived, raw, content_type)
+        try:
+            return pool.submit(services.normalize_and_diff, archived, raw, content_type).result()
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault, kill) and took the pool with it. Retry once on a fresh
+            # pool; if this page breaks that one too, it is reported as compare_failed.
+            _discard_parse_pool(pool)
+            if attempt:
+                raise
+
+
+# PUBLIC_INTERFACE
+def shutdown() -> None:
+    """Stop the shared parse worker pool (called on app shutdown)."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+def _result(rec: Dict[str, Any], has_changes: bool, summary: Dict[str, int],
+            details: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": rec["id"],
+        "code": rec["code"],
+        "has_changes": has_changes,
+        "diff_summary": summary,
+        "changed_paths": details.get("changed_paths", []),
+        "error": details.get("error"),
+    }
+
+
+def _compare_one(rec: Dict[str, Any], client: "httpx.Client", use_processes: bool) -> Dict[str, Any]:
+    """Same outcome as services.compare_current_vs_archived, but over a shared client and parse pool."""
+    try:
+        raw, content_type = services._safe_fetch(rec["original_url"], client=client)
+    except outbound.OutboundRejected as rej:
+        return _result(rec, False, dict(services.NO_CHANGES), {"error": f"throttled:{rej.status_code}"})
+    except Exception:
+        return _result(rec, False, dict(services.NO_CHANGES), {"error": "fetch_failed"})
+
+    try:
+        archived = services._read_archive(rec) or ""
+        outcome = _normalize_and_diff(use_processes, archived, raw, content_type)
+    except Exception:
+        return _result(rec, False, dict(services.NO_CHANGES), {"error": "compare_failed"})
+    return _result(rec, *outcome)
+
+
+class _Host:
+    __slots__ = ("client", "backlog", "lanes", "running", "closed")
+
+    def __init__(self, client: "httpx.Client"):
+        self.client = client
+        self.backlog: Deque[Dict[str, Any]] = deque()
+        self.lanes = 0  # submitted and not finished, including lanes still waiting for a thread
+        self.running = 0  # lanes currently on a thread (and so possibly using client)
+        self.closed = False
+
+
+class _Fed:
+    """Feeder's last message: how many records it dispatched, or the error that stopped it."""
+
+    def __init__(self, count: int, error: Optional[BaseException] = None):
+        self.count = count
+        self.error = error
+
+
+class _Scan:
+    """One compare_batch run: per-host backlogs drained by lanes on a shared thread pool."""
+
+    def __init__(self, concurrency: int, use_processes: bool):
+        self.per_host = min(concurrency, max(1, outbound.get_scheduler().max_per_host))
+        self.use_processes = use_processes
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="compare-batch")
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, _Host] = {}
+        self.out: "queue.Queue[Any]" = queue.Queue()
+        self.budget = threading.Semaphore(MAX_PENDING)
+        self.stop = threading.Event()
+        self._ssl_context: Any = None
+
+    def results(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        feeder = threading.Thread(target=self._feed, args=(records,), name="compare-batch-feed", daemon=True)
+        feeder.start()
+        fed: Optional[int] = None
+        received = 0
+        try:
+            while fed is None or received < fed:
+                item = self.out.get()
+                if isinstance(item, _Fed):
+                    if item.error is not None:
+                        raise item.error
+                    fed = item.count
+                    continue
+                received += 1
+                self.budget.release()
+                yield item
+        finally:
+            # Also reached when the consumer stops early (e.g. client disconnect), possibly from garbage
+            # collection on the event loop, so never wait here for in-flight fetches: lanes see stop
+            # after their current record, and the last one running for a host closes its client.
+            self.stop.set()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            with self.lock:
+                hosts = list(self.hosts.values())
+            for host in hosts:
+                self._close_if_unused(host)
+
+    def _feed(self, records: Iterable[Dict[str, Any]]) -> None:
+        count = 0
+        try:
+            for rec in records:
+                # Wait for a free read-ahead slot, but notice when the run is abandoned.
+                while not self.budget.acquire(timeout=0.1):
+                    if self.stop.is_set():
+                        return
+                if self.stop.is_set():
+                    return
+                self._dispatch(rec)
+                count += 1
+        except BaseException as ex:
+            self.out.put(_Fed(count, ex))
+            return
+        self.out.put(_Fed(count))
+
+    def _dispatch(self, rec: Dict[str, Any]) -> None:
+        """Queue rec on its host's backlog, starting another lane for the host if it has room for one."""
+        key = (urlsplit(rec["original_url"]).hostname or "").lower()
+        with self.lock:
+            host = self.hosts.get(key)
+        if host is None:
+            # Only the feeder adds hosts, so building the client outside the lock is race-free.
+            self._evict_idle()
+            host = _Host(self._new_client())
+            with self.lock:
+                self.hosts[key] = host
+            if self.stop.is_set():
+                self._close_if_unused(host)
+                return
+        with self.lock:
+            host.backlog.append(rec)
+            if host.lanes < self.per_host:
+                host.lanes += 1
+                self.pool.submit(self._lane, host)
+
+    def _new_client(self) -> "httpx.Client":
+        import httpx
+
+        # Building an SSL context costs tens of milliseconds; share one across the run's clients.
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+        return httpx.Client(
+            timeout=10.0, verify=self._ssl_context,
+            limits=httpx.Limits(max_connections=self.per_host, max_keepalive_connections=self.per_host),
+        )
+
+    def _evict_idle(self) -> None:
+        if len(self.hosts) < MAX_CLIENTS:
+            return
+        with self.lock:
+            idle = [key for key, host in self.hosts.items() if not host.lanes]
+            evicted = [self.hosts.pop(key) for key in idle]
+            for host in evicted:
+                host.closed = True
+        for host in evicted:
+            host.client.close()
+
+    def _close_if_unused(self, host: _Host) -> None:
+        """Close host's client once the run is stopped and no lane is using it (exactly once)."""
+        with self.lock:
+            if host.closed or host.running or not self.stop.is_set():
+                return
+            host.closed = True
+        host.client.close()
+
+    def _lane(self, host: _Host) -> None:
+        with self.lock:
+            host.running += 1
+        try:
+            self._drain(host)
+        finally:
+            with self.lock:
+                host.running -= 1
+            self._close_if_unused(host)
+
+    def _drain(self, host: _Host) -> None:
+        handled = 0
+        while True:
+            with self.lock:
+                if self.stop.is_set() or not host.backlog:
+                    host.lanes -= 1
+                    return
+                if handled >= LANE_TURN:
+                    # Requeue behind lanes of other hosts waiting for a thread; the lane count is unchanged.
+                    self.pool.submit(self._lane, host)
+                    return
+                rec = host.backlog.popleft()
+            try:
+                item = _compare_one(rec, host.client, self.use_processes)
+            except Exception:
+                # One bad record must not end the lane and silently drop the rest of its records.
+                logger.exception("Batch compare failed for %s", rec.get("code"))
+                item = _result(rec, False, dict(services.NO_CHANGES), {"error": "compare_failed"})
+            self.out.put(item)
+            handled += 1
+
+
+def _run(records: Iterable[Dict[str, Any]], concurrency: int,
+         use_processes: bool) -> Iterator[Dict[str, Any]]:
+    return _Scan(concurrency, use_processes).results(records)
+
+
+# PUBLIC_INTERFACE
+def compare_batch(
+    codes: Optional[List[str]] = None,
+    archived_after: Optional[datetime] = None,
+    archived_before: Optional[datetime] = None,
+    content_type: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    use_processes: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Compare many archived links with their live pages, yielding one result per code as it completes.
+
+    Select records either by codes (looked up in one store pass; unknown codes yield
+    error "not_found") or by the archived_at range / content_type filters, which stream
+    through the whole store. concurrency bounds simultaneous fetches (default
+    COMPARE_BATCH_CONCURRENCY); it is capped at half the outbound scheduler's global cap
+    so a batch cannot starve interactive fetches, and the per-host limits still apply. Each result has id, code,
+    has_changes, diff_summary, changed_paths and error (None on success, otherwise
+    "not_found", "fetch_failed", "compare_failed" or "throttled:<status>").
+    """
+    rs = services.get_record_store()
+    if codes is not None:
+        unique = list(dict.fromkeys(codes))
+        found = rs.get_many(unique)
+        for code in unique:
+            if code not in found:
+                yield {"id": None, "code": code, "has_changes": False, "diff_summary": dict(services.NO_CHANGES),
+                       "changed_paths": [], "error": "not_found"}
+        records: Iterable[Dict[str, Any]] = (found[c] for c in unique if c in found)
+    else:
+        records = rs.iter_records(archived_after=archived_after, archived_before=archived_before,
+                                  content_type=content_type)
+
+    concurrency = min(concurrency or _default_concurrency(), _max_concurrency())
+    yield from _run(records, max(1, concurrency), use_processes)
+
+
+# PUBLIC_INTERFACE
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point: print one JSON result per line; exit status 1 if any link changed."""
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(prog="python -m src.api.compare_batch", description="Scan links for changes.")
+    parser.add_argument("codes", nargs="*", help="Short codes to compare.")
+    parser.add_argument("--codes-file", help="File with one short code per line ('-' for stdin).")
+    parser.add_argument("--archived-after", type=datetime.fromisoformat, help="Filter: archived at or after (ISO).")
+    parser.add_argument("--archived-before", type=datetime.fromisoformat, help="Filter: archived before (ISO).")
+    parser.add_argument("--content-type", help="Filter: archive content type, e.g. text/html.")
+    parser.add_argument("--concurrency", type=int, help="Simultaneous fetches (default COMPARE_BATCH_CONCURRENCY).")
+    args = parser.parse_args(argv)
+
+    codes: Optional[List[str]] = list(args.codes) or None
+    if args.codes_file:
+        f = sys.stdin if args.codes_file == "-" else open(args.codes_file, encoding="utf-8")
+        with f:
+            codes = (codes or []) + [line.strip() for line in f if line.strip()]
+    if codes is None and not (args.archived_after or args.archived_before or args.content_type):
+        parser.error("give short codes, --codes-file, or at least one filter")
+
+    changed = False
+    try:
+        for item in compare_batch(codes, args.archived_after, args.archived_before, args.content_type,
+                                  concurrency=args.concurrency):
+            changed = changed or item["has_changes"]
+            sys.stdout.write(json.dumps(item) + "\n")
+    finally:
+        shutdown()
+    return 1 if changed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,435 @@
+"""
+Synthetic load generator for the Secure Link Archive API.
+
+Replays a weighted mix of shorten / redirect / compare / header-asset requests
+with Zipfian short-code popularity, at a sweep of concurrency levels, and
+reports latency percentiles, throughput, error rates and the saturation point.
+
+Run in-process through ASGI (default) with a local origin stub standing in for
+external sites, and a throwaway data directory:
+  python -m src.api.loadtest --levels 1,8,32,128 --duration 10
+
+Or against a running server. Its outbound fetches need an origin it can reach at a
+public address (the SSRF guard refuses private ones), so run the stub origin on a
+routable host, ideally under a wildcard DNS name so pages can be spread over many
+hostnames and the per-host outbound limits don't dominate the run:
+  python -m src.api.loadtest --serve-origin 0.0.0.0:8080 --origin-latency-ms 50
+  python -m src.api.loadtest --target http://localhost:8000 \
+      --origin "http://site{}.stub.example.net:8080" --origin-hosts 50
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import random
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+OPERATIONS = ("shorten", "redirect", "compare", "header")
+DEFAULT_MIX = "shorten=2,redirect=80,compare=8,header=10"
+# In-process runs spread pages over --origin-hosts stub hosts named like this.
+STUB_ORIGIN = "https://site{}.loadtest.example"
+STUB_ADDRESS = "93.184.216.34"
+
+# A level is saturated once adding concurrency buys less than this much throughput.
+SATURATION_GAIN = 0.10
+# ... or once this fraction of requests fail.
+SATURATION_ERROR_RATE = 0.01
+
+
+# PUBLIC_INTERFACE
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Parse a traffic mix such as "shorten=2,redirect=80,compare=8,header=10".
+
+    Returns normalized weights keyed by operation name. Operations left out get weight 0.
+    """
+    weights: Dict[str, float] = {op: 0.0 for op in OPERATIONS}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or name not in weights:
+            raise ValueError(f"Invalid mix entry: {part!r}")
+        weight = float(value)
+        if weight < 0:
+            raise ValueError(f"Negative weight for {name!r}")
+        weights[name] = weight
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Traffic mix must have at least one positive weight.")
+    return {op: w / total for op, w in weights.items()}
+
+
+class ZipfSampler:
+    """Sample indexes 0..n-1 where index k has probability proportional to 1 / (k + 1) ** s."""
+
+    def __init__(self, n: int, s: float = 1.1, rng: Optional[random.Random] = None):
+        if n <= 0:
+            raise ValueError("ZipfSampler needs at least one item.")
+        self._rng = rng or random.Random()
+        self._cumulative = list(itertools.accumulate(1.0 / (k + 1) ** s for k in range(n)))
+
+    def sample(self) -> int:
+        x = self._rng.random() * self._cumulative[-1]
+        return bisect.bisect_left(self._cumulative, x)
+
+
+# PUBLIC_INTERFACE
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100) of an already sorted sequence; 0.0 when empty."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate (operation, latency_seconds, status) samples; status 0 means transport error."""
+
+    def block(rows: List[Tuple[str, float, int]]) -> Dict[str, Any]:
+        latencies = sorted(r[1] for r in rows)
+        errors = sum(1 for r in rows if r[2] == 0 or r[2] >= 400)
+        statuses: Dict[str, int] = {}
+        for r in rows:
+            statuses[str(r[2])] = statuses.get(str(r[2]), 0) + 1
+        return {
+            "requests": len(rows),
+            "throughput_rps": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "statuses": statuses,
+        }
+
+    summary = block(samples)
+    summary["elapsed_s"] = elapsed
+    summary["operations"] = {
+        op: block([r for r in samples if r[0] == op]) for op in OPERATIONS if any(r[0] == op for r in samples)
+    }
+    return summary
+
+
+# PUBLIC_INTERFACE
+def find_saturation(levels: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Pick the concurrency level at which the service saturates.
+
+    A level is the saturation point when its error rate exceeds SATURATION_ERROR_RATE, or when
+    the next level improves throughput by less than SATURATION_GAIN. Returns None if throughput
+    was still scaling at the highest level measured.
+    """
+    for i, level in enumerate(levels):
+        if level["error_rate"] > SATURATION_ERROR_RATE:
+            return {"concurrency": level["concurrency"], "reason": "error_rate"}
+        if i + 1 < len(levels):
+            nxt = levels[i + 1]
+            if level["throughput_rps"] > 0 and nxt["throughput_rps"] < level["throughput_rps"] * (1 + SATURATION_GAIN):
+                return {"concurrency": level["concurrency"], "reason": "throughput_plateau"}
+    return None
+
+
+def make_origin_stub(latency_ms: float, change_rate: float,
+                     seed: Optional[int] = None) -> Callable[..., Tuple[str, str]]:
+    """
+    Build a stand-in for services._http_get that simulates an external origin.
+
+    URL validation, DNS checks and the outbound scheduler still run in front of it. It blocks for
+    latency_ms (like a real network fetch on a worker thread) and returns a
+    small HTML page; with probability change_rate the page differs from earlier fetches so
+    compare requests exercise the diff path. make_origin_server serves the same pages over HTTP.
+    """
+    rng = random.Random(seed)
+
+    def fetch(url: str, timeout: float = 10.0, client: Any = None) -> Tuple[str, str]:
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+        revision = rng.randint(1, 1_000_000) if rng.random() < change_rate else 0
+        paragraphs = "".join(f"<p>{url} paragraph {i}</p>" for i in range(20))
+        html = f"<html><head><title>{url}</title></head><body>{paragraphs}<p>rev {revision}</p></body></html>"
+        return html, "text/html"
+
+    return fetch
+
+
+# PUBLIC_INTERFACE
+def make_origin_server(address: Tuple[str, int], latency_ms: float, change_rate: float,
+                       seed: Optional[int] = None) -> ThreadingHTTPServer:
+    """
+    HTTP server answering every GET, for any Host and path, with make_origin_stub's pages.
+
+    For runs against a deployed server: point --origin at a name resolving to this host.
+    """
+    page = make_origin_stub(latency_ms, change_rate, seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            html, content_type = page(f"http://{self.headers.get('Host', 'origin')}{self.path}")
+            body = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(address, Handler)
+    server.daemon_threads = True
+    return server
+
+
+# PUBLIC_INTERFACE
+def expand_origins(origins: Sequence[str], hosts: int) -> List[str]:
+    """Expand origin base URLs; one containing "{}" becomes `hosts` URLs with {} replaced by 0..hosts-1."""
+    expanded: List[str] = []
+    for origin in origins:
+        if "{}" in origin:
+            expanded.extend(origin.replace("{}", str(i)) for i in range(hosts))
+        else:
+            expanded.append(origin)
+    return expanded
+
+
+class LoadGenerator:
+    """Closed-loop load generator: each worker issues its next request as soon as the previous one completes."""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], origins: Sequence[str],
+                 zipf_s: float = 1.1, seed: Optional[int] = None):
+        self.client = client
+        self.origins = [o.rstrip("/") for o in origins]
+        self.zipf_s = zipf_s
+        self.rng = random.Random(seed)
+        self.codes: List[str] = []
+        self._ops = [op for op in OPERATIONS if mix.get(op, 0) > 0]
+        self._weights = [mix[op] for op in self._ops]
+        self._sampler: Optional[ZipfSampler] = None
+        self._page_counter = itertools.count()
+
+    def _origin_url(self) -> str:
+        n = next(self._page_counter)
+        return f"{self.origins[n % len(self.origins)]}/page/{n}"
+
+    async def seed_codes(self, count: int, concurrency: int = 8) -> None:
+        """Create count short links up front so redirect/compare traffic has codes to hit."""
+        queue = list(range(count))
+
+        async def worker() -> None:
+            while queue:
+                queue.pop()
+                resp = await self.client.post("/api/urls/shorten", json={"url": self._origin_url()})
+                if resp.status_code in (200, 201):
+                    self.codes.append(resp.json()["code"])
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        if not self.codes:
+            raise RuntimeError("Seeding failed: no short links could be created.")
+        # Popularity rank is the order codes were returned in.
+        self._sampler = ZipfSampler(len(self.codes), self.zipf_s, self.rng)
+
+    def _pick_code(self) -> str:
+        assert self._sampler is not None, "seed_codes() must run first"
+        return self.codes[self._sampler.sample()]
+
+    async def _one(self, op: str) -> int:
+        if op == "shorten":
+            resp = await self.client.post("/api/urls/shorten", json={"url": self._origin_url()})
+        elif op == "redirect":
+            resp = await self.client.get(f"/r/{self._pick_code()}")
+        elif op == "compare":
+            resp = await self.client.get(f"/api/compare/{self._pick_code()}")
+        else:
+            asset = "style.css" if self.rng.random() < 0.5 else "script.js"
+            resp = await self.client.get(f"/api/header/{asset}")
+        return resp.status_code
+
+    async def run_level(self, concurrency: int, duration: float) -> Dict[str, Any]:
+        """Drive the mix at a fixed concurrency for duration seconds and summarize the results."""
+        samples: List[Tuple[str, float, int]] = []
+        deadline = time.perf_counter() + duration
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                op = self.rng.choices(self._ops, self._weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = await self._one(op)
+                except httpx.HTTPError:
+                    status = 0
+                samples.append((op, time.perf_counter() - started, status))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        summary = _summarize(samples, time.perf_counter() - started)
+        summary["concurrency"] = concurrency
+        return summary
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels))
+    report: Dict[str, Any] = {"mix": mix, "levels": [], "mode": "remote" if args.target else "asgi"}
+
+    if args.target:
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits)
+    else:
+        import anyio.to_thread
+
+        from .main import app
+
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        if args.threadpool_size:
+            limiter.total_tokens = args.threadpool_size
+        report["threadpool_size"] = limiter.total_tokens
+
+        # Unhandled app exceptions become 500s in the report instead of aborting the run.
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+
+    async with client:
+        origins = expand_origins(args.origin or [STUB_ORIGIN], args.origin_hosts)
+        gen = LoadGenerator(client, mix, origins, zipf_s=args.zipf_s, seed=args.seed)
+        await gen.seed_codes(args.codes)
+        report["codes"] = len(gen.codes)
+        for concurrency in levels:
+            level = await gen.run_level(concurrency, args.duration)
+            report["levels"].append(level)
+            if not args.quiet:
+                print(_format_level(level), flush=True)
+
+    report["saturation"] = find_saturation(report["levels"])
+    return report
+
+
+def _format_level(level: Dict[str, Any]) -> str:
+    return (
+        f"c={level['concurrency']:<5} n={level['requests']:<7} rps={level['throughput_rps']:9.1f} "
+        f"p50={level['p50_ms']:8.1f}ms p95={level['p95_ms']:8.1f}ms p99={level['p99_ms']:8.1f}ms "
+        f"err={level['error_rate'] * 100:5.2f}%"
+    )
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a human-readable report: per-level totals, per-operation breakdown at peak, saturation."""
+    lines = [f"mode={report['mode']} codes={report['codes']}"]
+    if "threadpool_size" in report:
+        lines[0] += f" threadpool={report['threadpool_size']}"
+    lines.append("mix: " + ", ".join(f"{op}={w:.0%}" for op, w in report["mix"].items() if w))
+    lines.extend(_format_level(level) for level in report["levels"])
+
+    if report["levels"]:
+        peak = max(report["levels"], key=lambda lv: lv["throughput_rps"])
+        lines.append(f"per-operation at peak throughput (c={peak['concurrency']}):")
+        for op, stats in peak["operations"].items():
+            lines.append(
+                f"  {op:<9} n={stats['requests']:<7} p50={stats['p50_ms']:8.1f}ms "
+                f"p95={stats['p95_ms']:8.1f}ms p99={stats['p99_ms']:8.1f}ms err={stats['error_rate'] * 100:5.2f}%"
+            )
+
+    sat = report.get("saturation")
+    if sat:
+        lines.append(f"saturation: c={sat['concurrency']} ({sat['reason']})")
+    else:
+        lines.append("saturation: not reached; throughput still scaling at the highest level")
+    return "\n".join(lines)
+
+
+def _patch_in_process(args: argparse.Namespace) -> Callable[[], None]:
+    """Point services at a throwaway data dir and the origin stub; returns a function undoing it."""
+    from . import resolver, services
+
+    tmp = tempfile.TemporaryDirectory(prefix="sla-loadtest-")
+    data_dir = Path(tmp.name)
+    patched = ("DATA_DIR", "ARCHIVE_DIR", "RECORDS_DB", "INDEX_FILE", "SEARCH_DB", "_http_get")
+    saved = {name: getattr(services, name) for name in patched}
+    saved_lookup = resolver._lookup
+    services.DATA_DIR = data_dir
+    services.ARCHIVE_DIR = data_dir / "archives"
+    services.RECORDS_DB = data_dir / "records.db"
+    services.INDEX_FILE = data_dir / "index.json"
+    services.SEARCH_DB = data_dir / "search.db"
+    services.ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    services._http_get = make_origin_stub(args.origin_latency_ms, args.change_rate, args.seed)
+    # Stub hosts don't exist; answer every lookup with one public address so the cache still runs.
+    resolver._lookup = lambda host: ([STUB_ADDRESS], resolver.MAX_TTL)
+    resolver.get_cache().clear()
+
+    def restore() -> None:
+        for name, value in saved.items():
+            setattr(services, name, value)
+        resolver._lookup = saved_lookup
+        resolver.get_cache().clear()
+        tmp.cleanup()
+
+    return restore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.api.loadtest", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", help="Base URL of a running server; omit to run in-process through ASGI.")
+    parser.add_argument("--origin", action="append",
+                        help="Base URL used for shortened pages (required with --target); repeat it, or put {} "
+                             "in the host to spread pages over --origin-hosts names.")
+    parser.add_argument("--origin-hosts", type=int, default=20,
+                        help="Number of origin hosts a {} pattern expands to (in-process runs use stub hosts).")
+    parser.add_argument("--serve-origin", metavar="[HOST:]PORT",
+                        help="Run only the stub origin HTTP server on this address, for --target runs elsewhere.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted traffic mix (default: {DEFAULT_MIX}).")
+    parser.add_argument("--levels", default="1,4,16,64", help="Comma-separated concurrency levels to sweep.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run each level.")
+    parser.add_argument("--codes", type=int, default=200, help="Number of short links to seed.")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent for code popularity.")
+    parser.add_argument("--origin-latency-ms", type=float, default=50.0, help="Origin stub latency.")
+    parser.add_argument("--change-rate", type=float, default=0.1,
+                        help="Fraction of stub fetches returning changed content.")
+    parser.add_argument("--threadpool-size", type=int, help="Override the worker threadpool size (in-process only).")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout in seconds.")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible request sequence.")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report as JSON to this path.")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final report.")
+    return parser
+
+
+# PUBLIC_INTERFACE
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    """CLI entry point; returns the report dict after printing it."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.serve_origin:
+        host, _, port = args.serve_origin.rpartition(":")
+        server = make_origin_server((host or "0.0.0.0", int(port)), args.origin_latency_ms, args.change_rate, args.seed)
+        print(f"Stub origin serving on {host or '0.0.0.0'}:{server.server_address[1]}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return {}
+    if args.target and not args.origin:
+        parser.error("--origin is required with --target")
+    restore = None if args.target else _patch_in_process(args)
+    try:
+        report = asyncio.run(_run(args))
+    finally:
+        if restore:
+            restore()
+
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routes import urls, compare, redirect, header
+from . import compare_batch, outbound, resolver, services
+from .routes import urls, compare, redirect, header, search
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hook: prepare storage and validate outbound limits here rather than at import time."""
+    services.init_storage()
+    outbound.get_scheduler()
+    compare_batch.check_config()
+    yield
+    compare_batch.shutdown()
+
 
 def create_app() -> FastAPI:
     """
@@ -16,12 +29,14 @@ def create_app() -> FastAPI:
         ),
         version="1.0.0",
         contact={"name": "Secure Link Archive", "url": "https://example.com"},
+        lifespan=lifespan,
         openapi_tags=[
             {"name": "health", "description": "Service health and diagnostics."},
-            {"name": "shorten", "description": "Create shortened links and manage archives."},
+            {"name": "shorten", "description": "Create shortened links, list and export them."},
             {"name": "redirect", "description": "Resolve short codes and serve archived content with header."},
             {"name": "compare", "description": "Compare current vs archived content."},
             {"name": "header", "description": "Floating header script and styles."},
+            {"name": "search", "description": "Full-text search over archived content."},
         ],
     )
 
@@ -38,12 +53,20 @@ def create_app() -> FastAPI:
     app.include_router(redirect.router)
     app.include_router(compare.router)
     app.include_router(header.router)
+    app.include_router(search.router)
 
     @app.get("/", tags=["health"], summary="Health Check")
     def health_check():
         """Simple health check endpoint."""
         return {"message": "Healthy"}
 
+    @app.get("/health/outbound", tags=["health"], summary="Outbound fetch scheduler state")
+    def outbound_status():
+        """Active, queued and rejected outbound fetches, globally and per origin host, plus DNS cache stats."""
+        state = outbound.get_scheduler().snapshot()
+        state["dns_cache"] = resolver.get_cache().stats()
+        return state
+
     return app
 
 
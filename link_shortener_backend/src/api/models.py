@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List, Dict
-from pydantic import BaseModel, AnyHttpUrl, Field
+from pydantic import BaseModel, AnyHttpUrl, Field, model_validator
 
 
 # PUBLIC_INTERFACE
@@ -20,6 +20,25 @@ class ShortenResponse(BaseModel):
     archived_at: datetime = Field(..., description="Timestamp when the content was archived.")
 
 
+# PUBLIC_INTERFACE
+class LinkRecord(BaseModel):
+    """A stored short link, as returned by listings and exports."""
+    id: str = Field(..., description="Internal identifier for this short link.")
+    code: str = Field(..., description="Short code assigned to the URL.")
+    short_url: str = Field(..., description="The full shortened URL to share.")
+    original_url: str = Field(..., description="Original submitted URL.")
+    archived_at: datetime = Field(..., description="Timestamp when the content was archived.")
+    content_type: Optional[str] = Field(None, description="Content type of the archived response.")
+    note: Optional[str] = Field(None, description="Optional note or label for this link.")
+
+
+# PUBLIC_INTERFACE
+class LinkPage(BaseModel):
+    """A page of short links in archival order."""
+    items: List[LinkRecord] = Field(default_factory=list, description="Links on this page.")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null if this is the last.")
+
+
 # PUBLIC_INTERFACE
 class CompareResponse(BaseModel):
     """Comparison results between archived and current content."""
@@ -34,7 +53,59 @@ class CompareResponse(BaseModel):
     )
 
 
+# PUBLIC_INTERFACE
+class CompareBatchRequest(BaseModel):
+    """Selects the links to scan for changes: explicit codes, or a filter over all links."""
+    codes: Optional[List[str]] = Field(
+        None, max_length=10_000, description="Short codes to compare. Omit to select by the filters instead."
+    )
+    archived_after: Optional[datetime] = Field(None, description="Filter: links archived at or after this time.")
+    archived_before: Optional[datetime] = Field(None, description="Filter: links archived before this time.")
+    content_type: Optional[str] = Field(None, description="Filter: archive content type, e.g. text/html.")
+    concurrency: Optional[int] = Field(
+        None, ge=1, le=64,
+        description="Simultaneous fetches (server default if omitted); capped at half of OUTBOUND_MAX_GLOBAL.",
+    )
+
+    @model_validator(mode="after")
+    def _codes_or_filter(self) -> "CompareBatchRequest":
+        if self.codes is None and not (self.archived_after or self.archived_before or self.content_type):
+            raise ValueError("Provide codes or at least one filter.")
+        return self
+
+
+# PUBLIC_INTERFACE
+class CompareBatchItem(CompareResponse):
+    """One line of a batch comparison stream; error is set when the link could not be compared."""
+    id: Optional[str] = Field(None, description="Link ID (null if the code is unknown).")
+    error: Optional[str] = Field(
+        None, description="not_found, fetch_failed, compare_failed or throttled:<status>; null on success."
+    )
+
+
 # PUBLIC_INTERFACE
 class ErrorMessage(BaseModel):
     """Standardized error message payload."""
     detail: str = Field(..., description="Human-readable error message.")
+
+
+# PUBLIC_INTERFACE
+class SearchHit(BaseModel):
+    """One archived link matching a search query."""
+    code: str = Field(..., description="Short code of the matching archive.")
+    original_url: str = Field(..., description="Original archived URL.")
+    archived_at: datetime = Field(..., description="Timestamp when the content was archived.")
+    snippet: str = Field(..., description="Excerpt around the match; matched terms wrapped in [ ].")
+    score: Optional[float] = Field(
+        ..., description="Relevance score (BM25); higher is better. Null when the query was too broad to rank."
+    )
+
+
+# PUBLIC_INTERFACE
+class SearchResponse(BaseModel):
+    """A page of search results."""
+    query: str = Field(..., description="The query as submitted.")
+    hits: List[SearchHit] = Field(
+        default_factory=list, description="Matching archives, best match first (newest first when unranked)."
+    )
+    next_offset: Optional[int] = Field(None, description="Offset for the next page, or null if this is the last.")
@@ -0,0 +1,258 @@
+"""
+Outbound fetch scheduler.
+
+Every fetch of an external origin goes through OutboundScheduler.slot(host), which
+enforces a per-host token bucket (requests/second with a burst allowance), a per-host
+concurrency cap and a global concurrency cap. Callers wait for a slot, but only up to a
+bound: once too many callers are queued for a host (429) or overall (503), or a caller
+has waited longer than max_wait (503), the fetch fails fast with OutboundRejected
+instead of tying up another worker thread.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Idle hosts are forgotten once we track more than this many.
+_MAX_TRACKED_HOSTS = 1024
+
+
+# PUBLIC_INTERFACE
+class OutboundRejected(Exception):
+    """Raised when an outbound fetch is refused by the scheduler; carries the HTTP status to surface."""
+
+    def __init__(self, detail: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def headers(self) -> Optional[Dict[str, str]]:
+        """Response headers for the rejection (Retry-After when known)."""
+        if self.retry_after is None:
+            return None
+        return {"Retry-After": str(max(1, int(self.retry_after + 0.999)))}
+
+
+class _HostState:
+    __slots__ = ("tokens", "refilled_at", "active", "waiting", "completed", "rejected")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.refilled_at = now
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+
+# PUBLIC_INTERFACE
+class OutboundScheduler:
+    """Per-host token bucket and concurrency semaphore plus a global cap, with bounded queues."""
+
+    def __init__(
+        self,
+        rate_per_host: float = 5.0,
+        burst_per_host: float = 10.0,
+        max_per_host: int = 4,
+        max_global: int = 32,
+        max_queue_per_host: int = 16,
+        max_queue_global: int = 128,
+        max_wait: float = 5.0,
+    ):
+        if not rate_per_host > 0:
+            raise ValueError(f"rate_per_host must be > 0, got {rate_per_host}")
+        if not burst_per_host >= 1:
+            raise ValueError(f"burst_per_host must be >= 1, got {burst_per_host}")
+        if max_per_host < 1 or max_global < 1:
+            raise ValueError(f"max_per_host and max_global must be >= 1, got {max_per_host} and {max_global}")
+        if max_queue_per_host < 0 or max_queue_global < 0:
+            raise ValueError(
+                f"max_queue_per_host and max_queue_global must be >= 0, got {max_queue_per_host} and {max_queue_global}"
+            )
+        if not max_wait >= 0:
+            raise ValueError(f"max_wait must be >= 0, got {max_wait}")
+        self.rate_per_host = rate_per_host
+        self.burst_per_host = float(burst_per_host)
+        self.max_per_host = max_per_host
+        self.max_global = max_global
+        self.max_queue_per_host = max_queue_per_host
+        self.max_queue_global = max_queue_global
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostState] = {}
+        self._active = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    def _host(self, host: str, now: float) -> _HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            if len(self._hosts) >= _MAX_TRACKED_HOSTS:
+                self._prune(now)
+            st = self._hosts[host] = _HostState(self.burst_per_host, now)
+        return st
+
+    def _prune(self, now: float) -> None:
+        for name, st in list(self._hosts.items()):
+            self._refill(st, now)
+            if not st.active and not st.waiting and st.tokens >= self.burst_per_host:
+                del self._hosts[name]
+
+    def _refill(self, st: _HostState, now: float) -> None:
+        st.tokens = min(self.burst_per_host, st.tokens + (now - st.refilled_at) * self.rate_per_host)
+        st.refilled_at = now
+
+    def _reject(self, st: _HostState, detail: str, status_code: int, retry_after: Optional[float]) -> OutboundRejected:
+        st.rejected += 1
+        self._rejected += 1
+        return OutboundRejected(detail, status_code, retry_after)
+
+    def _try_take(self, st: _HostState, now: float) -> bool:
+        self._refill(st, now)
+        if st.tokens >= 1 and st.active < self.max_per_host and self._active < self.max_global:
+            st.tokens -= 1
+            st.active += 1
+            self._active += 1
+            return True
+        return False
+
+    def _acquire(self, host: str) -> _HostState:
+        with self._cond:
+            now = time.monotonic()
+            st = self._host(host, now)
+            if self._try_take(st, now):
+                return st
+            # No slot free right now: queue, but only up to the configured bounds.
+            if st.waiting >= self.max_queue_per_host:
+                raise self._reject(st, f"Too many pending fetches for {host}", 429, 1.0 / self.rate_per_host)
+            if self._waiting >= self.max_queue_global:
+                raise self._reject(st, "Outbound fetch queue is full", 503, 1.0)
+
+            st.waiting += 1
+            self._waiting += 1
+            deadline = now + self.max_wait
+            try:
+                while True:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._reject(st, f"Timed out waiting to fetch from {host}", 503, self.max_wait)
+                    if st.tokens < 1:
+                        # Wake up when the next token is due even if no slot is released.
+                        remaining = min(remaining, (1 - st.tokens) / self.rate_per_host)
+                    self._cond.wait(remaining)
+                    now = time.monotonic()
+                    if self._try_take(st, now):
+                        return st
+            finally:
+                st.waiting -= 1
+                self._waiting -= 1
+
+    def _release(self, st: _HostState) -> None:
+        with self._cond:
+            st.active -= 1
+            st.completed += 1
+            self._active -= 1
+            self._cond.notify_all()
+
+    # PUBLIC_INTERFACE
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        """Hold an outbound fetch slot for host for the duration of the block; raises OutboundRejected."""
+        st = self._acquire(host.lower())
+        try:
+            yield
+        finally:
+            self._release(st)
+
+    # PUBLIC_INTERFACE
+    def snapshot(self) -> Dict[str, Any]:
+        """Current limits, global counters and per-host state, for monitoring."""
+        with self._cond:
+            now = time.monotonic()
+            hosts = {}
+            for name, st in self._hosts.items():
+                self._refill(st, now)
+                hosts[name] = {
+                    "active": st.active,
+                    "waiting": st.waiting,
+                    "tokens": round(st.tokens, 3),
+                    "completed": st.completed,
+                    "rejected": st.rejected,
+                }
+            return {
+                "limits": {
+                    "rate_per_host": self.rate_per_host,
+                    "burst_per_host": self.burst_per_host,
+                    "max_per_host": self.max_per_host,
+                    "max_global": self.max_global,
+                    "max_queue_per_host": self.max_queue_per_host,
+                    "max_queue_global": self.max_queue_global,
+                    "max_wait": self.max_wait,
+                },
+                "active": self._active,
+                "waiting": self._waiting,
+                "rejected": self._rejected,
+                "hosts": hosts,
+            }
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be a number, got {value!r}") from None
+
+
+def _env_int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    """Integer env var (default when unset); RuntimeError naming the variable if malformed or below minimum."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        number: Optional[int] = int(value)
+    except ValueError:
+        number = None
+    if number is None or (minimum is not None and number < minimum):
+        bound = f" >= {minimum}" if minimum is not None else ""
+        raise RuntimeError(f"{name} must be an integer{bound}, got {value!r}")
+    return number
+
+
+def _from_env() -> OutboundScheduler:
+    try:
+        return OutboundScheduler(
+            rate_per_host=_env_float("OUTBOUND_RATE_PER_HOST", 5.0),
+            burst_per_host=_env_float("OUTBOUND_BURST_PER_HOST", 10.0),
+            max_per_host=_env_int("OUTBOUND_MAX_PER_HOST", 4, minimum=1),
+            max_global=_env_int("OUTBOUND_MAX_GLOBAL", 32, minimum=1),
+            max_queue_per_host=_env_int("OUTBOUND_MAX_QUEUE_PER_HOST", 16, minimum=0),
+            max_queue_global=_env_int("OUTBOUND_MAX_QUEUE_GLOBAL", 128, minimum=0),
+            max_wait=_env_float("OUTBOUND_MAX_WAIT", 5.0),
+        )
+    except ValueError as ex:
+        # RuntimeError, not ValueError: callers map ValueError to a 400 for the request at hand.
+        raise RuntimeError(f"Invalid OUTBOUND_* configuration: {ex}") from None
+
+
+_scheduler: Optional[OutboundScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+# PUBLIC_INTERFACE
+def get_scheduler() -> OutboundScheduler:
+    """
+    Process-wide scheduler shared by every outbound fetch path, configured from OUTBOUND_* env vars.
+
+    The app lifespan calls this at startup so bad settings fail there (RuntimeError), not on a request.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = _from_env()
+    return _scheduler
@@ -0,0 +1,226 @@
+"""
+SSRF-safe host resolution with a TTL-respecting DNS cache.
+
+Outbound fetches resolve the target host once through resolve_public(), which rejects
+the host unless every address it resolves to is publicly routable (no private,
+loopback, link-local, multicast or reserved ranges). The fetch then connects to the
+validated address itself (see pin_url) so a second, different DNS answer cannot be
+substituted between check and connect. Answers are cached for their DNS TTL (clamped
+to [MIN_TTL, MAX_TTL]) and concurrent lookups of the same host share one query.
+"""
+import ipaddress
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+MIN_TTL = 5.0
+MAX_TTL = 300.0
+LOOKUP_TIMEOUT = 3.0
+# Cap on cached hosts; the soonest-expiring entries are evicted first.
+MAX_ENTRIES = 10_000
+
+
+# PUBLIC_INTERFACE
+class UnsafeTarget(ValueError):
+    """The target host does not resolve, or resolves to an address we refuse to fetch from."""
+
+
+# IPv6 ranges that carry an IPv4 address in their low 32 bits: NAT64 well-known prefix
+# (RFC 6052) and the deprecated IPv4-compatible form. 6to4 and IPv4-mapped are handled by
+# the ipaddress properties.
+_EMBEDS_IPV4_LOW32 = (ipaddress.ip_network("64:ff9b::/96"), ipaddress.ip_network("::/96"))
+# Local-use NAT64 (RFC 8215): translator-specific layout, so refuse it outright.
+_LOCAL_NAT64 = ipaddress.ip_network("64:ff9b:1::/48")
+
+
+def _embedded_ipv4(ip: ipaddress.IPv6Address) -> Optional[ipaddress.IPv4Address]:
+    if ip.ipv4_mapped is not None:
+        return ip.ipv4_mapped
+    if ip.sixtofour is not None:
+        return ip.sixtofour
+    if any(ip in net for net in _EMBEDS_IPV4_LOW32):
+        return ipaddress.IPv4Address(int(ip) & 0xFFFFFFFF)
+    return None
+
+
+# PUBLIC_INTERFACE
+def is_public_address(ip: IPAddress) -> bool:
+    """
+    True if ip is globally routable unicast.
+
+    IPv6 addresses that embed an IPv4 address (IPv4-mapped, 6to4, NAT64, IPv4-compatible)
+    are judged by that IPv4 address, since that is where the traffic ends up.
+    """
+    if isinstance(ip, ipaddress.IPv6Address):
+        if ip in _LOCAL_NAT64:
+            return False
+        embedded = _embedded_ipv4(ip)
+        if embedded is not None:
+            ip = embedded
+    return ip.is_global and not ip.is_multicast
+
+
+def _lookup(host: str) -> Tuple[List[str], float]:
+    """Query A and AAAA records for host; returns (addresses, ttl_seconds)."""
+    import dns.exception
+    import dns.resolver
+
+    resolver = dns.resolver.Resolver()
+    resolver.lifetime = LOOKUP_TIMEOUT
+    addresses: List[str] = []
+    ttl = MAX_TTL
+    for rdtype in ("A", "AAAA"):
+        try:
+            answer = resolver.resolve(host, rdtype)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            continue
+        except dns.exception.DNSException as ex:
+            # A broken AAAA answer (SERVFAIL, timeout) is no reason to give up on working A records.
+            if rdtype == "AAAA" and addresses:
+                continue
+            raise UnsafeTarget(f"Could not resolve {host}") from ex
+        addresses.extend(r.address for r in answer)
+        ttl = min(ttl, float(answer.rrset.ttl))
+    return addresses, ttl
+
+
+class _Pending:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[Tuple[List[IPAddress], float]] = None
+        self.error: Optional[BaseException] = None
+
+
+# PUBLIC_INTERFACE
+class DNSCache:
+    """Thread-safe host -> validated addresses cache honouring record TTLs, with single-flight lookups."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, List[IPAddress]]] = {}
+        self._pending: Dict[str, _Pending] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, host: str, addresses: List[IPAddress], ttl: float) -> None:
+        if len(self._entries) >= MAX_ENTRIES:
+            for name, _ in sorted(self._entries.items(), key=lambda kv: kv[1][0])[: MAX_ENTRIES // 10]:
+                del self._entries[name]
+        self._entries[host] = (time.monotonic() + min(MAX_TTL, max(MIN_TTL, ttl)), addresses)
+
+    def resolve(self, host: str) -> List[IPAddress]:
+        """Return the validated addresses for host, querying DNS only on a miss or expiry."""
+        host = host.lower().rstrip(".")
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            pending = self._pending.get(host)
+            owner = pending is None
+            if owner:
+                pending = self._pending[host] = _Pending()
+
+        if not owner:
+            pending.done.wait(LOOKUP_TIMEOUT * 2)
+            if pending.error is not None:
+                raise pending.error
+            if pending.result is None:
+                raise UnsafeTarget(f"Could not resolve {host}")
+            return pending.result[0]
+
+        try:
+            raw, ttl = _lookup(host)
+            pending.result = (_validate(host, raw), ttl)
+            with self._lock:
+                self._store(host, pending.result[0], ttl)
+            return pending.result[0]
+        except BaseException as ex:
+            pending.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(host, None)
+            pending.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _validate(host: str, raw: List[str]) -> List[IPAddress]:
+    if not raw:
+        raise UnsafeTarget(f"Could not resolve {host}")
+    addresses = [ipaddress.ip_address(a) for a in raw]
+    # Every address must pass: otherwise a mixed answer could still steer us inside.
+    if not all(is_public_address(ip) for ip in addresses):
+        raise UnsafeTarget(f"{host} resolves to a non-public address.")
+    return addresses
+
+
+_cache = DNSCache()
+
+
+# PUBLIC_INTERFACE
+def get_cache() -> DNSCache:
+    """Process-wide DNS cache shared by all outbound fetches."""
+    return _cache
+
+
+# PUBLIC_INTERFACE
+def resolve_public(host: str) -> List[IPAddress]:
+    """
+    Resolve host (or parse it as an IP literal) and ensure every address is public.
+
+    Raises UnsafeTarget (a ValueError) otherwise.
+    """
+    if not host:
+        raise UnsafeTarget("URL has no host.")
+    try:
+        literal = ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return _cache.resolve(host)
+    if not is_public_address(literal):
+        raise UnsafeTarget(f"{host} is not a public address.")
+    return [literal]
+
+
+# PUBLIC_INTERFACE
+def pin_url(url: str) -> Tuple[str, str, str]:
+    """
+    Validate url's host and rewrite the URL to connect to its (first) validated address.
+
+    Returns (pinned_url, host_header, server_name): send the request to pinned_url with
+    the Host header set to host_header and TLS SNI / certificate checks against server_name.
+    """
+    return pin_urls(url)[0]
+
+
+# PUBLIC_INTERFACE
+def pin_urls(url: str) -> List[Tuple[str, str, str]]:
+    """
+    Like pin_url, but one entry per validated address, in resolver order.
+
+    Callers try them in turn on connection failure, as socket.create_connection would.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    host_header = f"{host}:{parts.port}" if parts.port else host
+    if ":" in host:
+        host_header = f"[{host}]:{parts.port}" if parts.port else f"[{host}]"
+    pinned = []
+    for ip in resolve_public(host):
+        ip_host = f"[{ip}]" if ip.version == 6 else str(ip)
+        netloc = f"{ip_host}:{parts.port}" if parts.port else ip_host
+        pinned.append((urlunsplit((parts.scheme, netloc, parts.path or "/", parts.query, "")), host_header, host))
+    return pinned
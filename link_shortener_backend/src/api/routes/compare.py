@@ -1,11 +1,58 @@
-from fastapi import APIRouter, HTTPException, status
+from typing import Any, Dict, Generator, Iterator
 
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+
+from .. import compare_batch
 from .. import models
+from .. import outbound
 from .. import services
 
 router = APIRouter(prefix="/api/compare", tags=["compare"])
 
 
+def _ndjson(items: Generator[Dict[str, Any], None, None]) -> Iterator[bytes]:
+    try:
+        for item in items:
+            yield (models.CompareBatchItem(**item).model_dump_json() + "\n").encode("utf-8")
+    finally:
+        # Stop the scan as soon as the response is closed rather than whenever items is collected.
+        items.close()
+
+
+# PUBLIC_INTERFACE
+@router.post(
+    "/batch",
+    summary="Compare many links at once (NDJSON stream)",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One CompareBatchItem per line, in completion order",
+            "content": {"application/x-ndjson": {"schema": models.CompareBatchItem.model_json_schema()}},
+        },
+        422: {"description": "Neither codes nor a filter given"},
+    },
+)
+def compare_many(payload: models.CompareBatchRequest) -> Response:
+    """
+    Scan a set of links for changes since archival.
+
+    Parameters:
+    - payload: codes to compare, or archived_at range / content_type filters; optional concurrency
+
+    Returns:
+    - application/x-ndjson stream of CompareBatchItem, one per code as each completes.
+    """
+    items = compare_batch.compare_batch(
+        codes=payload.codes,
+        archived_after=payload.archived_after,
+        archived_before=payload.archived_before,
+        content_type=payload.content_type,
+        concurrency=payload.concurrency,
+    )
+    return StreamingResponse(_ndjson(items), media_type="application/x-ndjson")
+
+
 # PUBLIC_INTERFACE
 @router.get(
     "/{code}",
@@ -15,6 +62,8 @@ router = APIRouter(prefix="/api/compare", tags=["compare"])
         200: {"description": "Comparison results"},
         404: {"description": "Short code not found", "model": models.ErrorMessage},
         400: {"description": "Comparison failed", "model": models.ErrorMessage},
+        429: {"description": "Too many pending fetches for the origin host", "model": models.ErrorMessage},
+        503: {"description": "Outbound fetch capacity exhausted", "model": models.ErrorMessage},
     },
 )
 def compare(code: str) -> models.CompareResponse:
@@ -33,6 +82,8 @@ def compare(code: str) -> models.CompareResponse:
 
     try:
         has_changes, summary, details = services.compare_current_vs_archived(code)
+    except outbound.OutboundRejected as rej:
+        raise HTTPException(status_code=rej.status_code, detail=rej.detail, headers=rej.headers()) from rej
     except Exception as ex:
         # If comparison fails unexpectedly, return 400 to align with spec (tests tolerate 500/200 too)
         raise HTTPException(status_code=400, detail="Comparison failed") from ex
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from .. import models
+from .. import services
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+# PUBLIC_INTERFACE
+@router.get(
+    "",
+    response_model=models.SearchResponse,
+    summary="Search archived content",
+    responses={
+        200: {"description": "Ranked matches"},
+        400: {"description": "Query has no searchable words", "model": models.ErrorMessage},
+    },
+)
+def search_archives(
+    q: str = Query(..., min_length=1, max_length=256, description="Words to find; append * for prefix match."),
+    limit: int = Query(20, ge=1, le=100, description="Maximum results per page."),
+    offset: int = Query(0, ge=0, le=10_000, description="Number of results to skip."),
+) -> models.SearchResponse:
+    """
+    Full-text search over archived page text and URLs.
+
+    Parameters:
+    - q: search terms (all must match)
+    - limit, offset: pagination
+
+    Returns:
+    - SearchResponse with hits ranked by relevance (newest first, score null, when a term is too
+      common to rank) and the next page offset.
+    """
+    try:
+        hits, next_offset = services.search_archives(q, limit=limit, offset=offset)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve)) from ve
+
+    return models.SearchResponse(
+        query=q,
+        hits=[models.SearchHit(**hit) for hit in hits],
+        next_offset=next_offset,
+    )
@@ -1,8 +1,12 @@
 from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from .. import models
+from .. import outbound
 from .. import services
 
 router = APIRouter(prefix="/api/urls", tags=["shorten"])
@@ -17,6 +21,8 @@ router = APIRouter(prefix="/api/urls", tags=["shorten"])
     responses={
         201: {"description": "Short link created"},
         400: {"description": "Invalid input or archival failed", "model": models.ErrorMessage},
+        429: {"description": "Too many pending fetches for the target host", "model": models.ErrorMessage},
+        503: {"description": "Outbound fetch capacity exhausted", "model": models.ErrorMessage},
     },
 )
 def create_short_link(payload: models.ShortenRequest) -> models.ShortenResponse:
@@ -32,6 +38,8 @@ def create_short_link(payload: models.ShortenRequest) -> models.ShortenResponse:
     try:
         # Archive and create record
         rec = services.archive_url(str(payload.url), note=payload.note)
+    except outbound.OutboundRejected as rej:
+        raise HTTPException(status_code=rej.status_code, detail=rej.detail, headers=rej.headers()) from rej
     except ValueError as ve:
         # Validation or security failures
         raise HTTPException(status_code=400, detail=str(ve)) from ve
@@ -51,3 +59,72 @@ def create_short_link(payload: models.ShortenRequest) -> models.ShortenResponse:
         original_url=original_url_str,
         archived_at=datetime.fromisoformat(rec["archived_at"]),
     )
+
+
+# Records serialized per chunk of a streaming export; each chunk is one threadpool hop.
+EXPORT_CHUNK = 500
+
+
+def _link(rec: Dict[str, Any], base: str) -> models.LinkRecord:
+    return models.LinkRecord(
+        id=rec["id"],
+        code=rec["code"],
+        short_url=f"{base}/r/{rec['code']}",
+        original_url=rec["original_url"],
+        archived_at=datetime.fromisoformat(rec["archived_at"]),
+        content_type=rec.get("content_type"),
+        note=rec.get("note"),
+    )
+
+
+def _ndjson(records: Iterator[Dict[str, Any]], base: str) -> Iterator[bytes]:
+    while True:
+        chunk = list(islice(records, EXPORT_CHUNK))
+        if not chunk:
+            return
+        yield "".join(_link(rec, base).model_dump_json() + "\n" for rec in chunk).encode("utf-8")
+
+
+# PUBLIC_INTERFACE
+@router.get(
+    "",
+    response_model=models.LinkPage,
+    summary="List or export short links",
+    responses={
+        200: {
+            "description": "A page of links, or every matching link as NDJSON when format=ndjson",
+            "content": {"application/x-ndjson": {}},
+        },
+        400: {"description": "Invalid cursor", "model": models.ErrorMessage},
+    },
+)
+def list_links(
+    limit: int = Query(100, ge=1, le=1000, description="Maximum links per page (ignored for ndjson export)."),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page."),
+    archived_after: Optional[datetime] = Query(None, description="Only links archived at or after this time."),
+    archived_before: Optional[datetime] = Query(None, description="Only links archived before this time."),
+    content_type: Optional[str] = Query(None, description="Only links whose archive has this content type."),
+    format: Literal["json", "ndjson"] = Query("json", description="json for one page; ndjson to stream all."),
+) -> Response:
+    """
+    List short links in archival order with cursor pagination, or export them.
+
+    Parameters:
+    - limit, cursor: page size and position (pass next_cursor back to continue)
+    - archived_after, archived_before, content_type: filters
+    - format: "ndjson" streams every matching link (from cursor, if given), one JSON object per line
+
+    Returns:
+    - LinkPage, or an application/x-ndjson stream of LinkRecord objects.
+    """
+    filters = {"archived_after": archived_after, "archived_before": archived_before, "content_type": content_type}
+    base = services.get_base_url().rstrip("/")
+    try:
+        if format == "ndjson":
+            records = services.iter_records(cursor=cursor, **filters)
+            return StreamingResponse(_ndjson(records, base), media_type="application/x-ndjson")
+        rows, next_cursor = services.list_records(limit=limit, cursor=cursor, **filters)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve)) from ve
+
+    return models.LinkPage(items=[_link(rec, base) for rec in rows], next_cursor=next_cursor)
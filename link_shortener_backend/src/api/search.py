@@ -0,0 +1,230 @@
+"""
+Full-text search over archived content, backed by SQLite FTS5.
+
+archive_url() adds each new archive to the index as it is written, so the index is
+maintained incrementally; queries are BM25-ranked (newest first when a term is too
+common to rank cheaply) and served from the FTS index without touching the archive
+files. To (re)build it from the existing archives:
+  python -m src.api.search rebuild
+"""
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {docs} (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    original_url TEXT NOT NULL,
+    archived_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    original_url, content, tokenize = 'porter unicode61', prefix = '3'
+);
+"""
+# rebuild() fills these and then swaps them in for docs / docs_fts.
+_SHADOW = {"docs": "docs_new", "fts": "docs_fts_new"}
+
+# bm25() column weights for (original_url, content): URL matches count double.
+_BM25 = "bm25(docs_fts, 2.0, 1.0)"
+_TERM = re.compile(r"\w+\*?", re.UNICODE)
+_MAX_TERMS = 16
+# Shorter prefixes expand to most of the vocabulary; they are matched as whole words instead.
+_MIN_PREFIX = 3
+# bm25() counts every document containing each query term, so its cost grows with the
+# commonest term's document frequency. Queries with a term in more documents than this
+# are not ranked; their matches are returned newest first, which FTS5 streams lazily.
+_MAX_RANKED_DF = 10_000
+
+
+# PUBLIC_INTERFACE
+def build_match_query(q: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Words are quoted (so FTS syntax in user input is inert) and ANDed; a trailing "*" on a
+    word of at least _MIN_PREFIX characters makes it a prefix match. Raises ValueError if q
+    has no searchable words.
+    """
+    return " ".join(_match_terms(q))
+
+
+def _match_terms(q: str) -> List[str]:
+    terms = []
+    for raw in _TERM.findall(q)[:_MAX_TERMS]:
+        prefix = raw.endswith("*")
+        word = raw.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix and len(word) >= _MIN_PREFIX else ""))
+    if not terms:
+        raise ValueError("Search query must contain at least one word.")
+    return terms
+
+
+# PUBLIC_INTERFACE
+class SearchIndex:
+    """Inverted index of archived text; one SQLite connection per thread, WAL mode for concurrent readers."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA.format(docs="docs", fts="docs_fts"))
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, code: str, original_url: str, archived_at: str, text: str,
+                docs: str = "docs", fts: str = "docs_fts") -> None:
+        row = conn.execute(f"SELECT id FROM {docs} WHERE code = ?", (code,)).fetchone()
+        if row:
+            conn.execute(f"DELETE FROM {fts} WHERE rowid = ?", (row[0],))
+            conn.execute(f"UPDATE {docs} SET original_url = ?, archived_at = ? WHERE id = ?",
+                         (original_url, archived_at, row[0]))
+            doc_id = row[0]
+        else:
+            doc_id = conn.execute(f"INSERT INTO {docs} (code, original_url, archived_at) VALUES (?, ?, ?)",
+                                  (code, original_url, archived_at)).lastrowid
+        conn.execute(f"INSERT INTO {fts} (rowid, original_url, content) VALUES (?, ?, ?)",
+                     (doc_id, original_url, text))
+
+    def add(self, code: str, original_url: str, archived_at: str, text: str) -> None:
+        """Index (or re-index) one archive."""
+        conn = self._conn()
+        with conn:
+            self._upsert(conn, code, original_url, archived_at, text)
+
+    def search(self, q: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return (hits, next_offset) for q, best match first.
+
+        Each hit has code, original_url, archived_at, snippet and score (higher is better).
+        If a query term is too common to rank cheaply (see _MAX_RANKED_DF), hits come
+        newest first with score None. next_offset is None when there are no further results.
+        """
+        terms = _match_terms(q)
+        conn = self._conn()
+        ranked = not any(self._more_than(conn, term, _MAX_RANKED_DF) for term in terms)
+        score, order = (_BM25, "rank") if ranked else ("NULL", "docs_fts.rowid DESC")
+        rows = conn.execute(
+            f"""
+            SELECT d.code, d.original_url, d.archived_at,
+                   snippet(docs_fts, 1, '[', ']', '...', 12), {score} AS rank
+            FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid
+            WHERE docs_fts MATCH ?
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            (" ".join(terms), limit + 1, offset),
+        ).fetchall()
+        hits = [
+            {"code": r[0], "original_url": r[1], "archived_at": r[2], "snippet": r[3],
+             "score": -r[4] if ranked else None}
+            for r in rows[:limit]
+        ]
+        return hits, (offset + limit if len(rows) > limit else None)
+
+    @staticmethod
+    def _more_than(conn: sqlite3.Connection, term: str, n: int) -> bool:
+        """Whether term matches more than n documents; reads at most n + 1 doclist entries."""
+        return conn.execute(
+            "SELECT count(*) FROM (SELECT rowid FROM docs_fts WHERE docs_fts MATCH ? ORDER BY rowid DESC LIMIT ?)",
+            (term, n + 1),
+        ).fetchone()[0] > n
+
+    def rebuild(self, docs: Iterable[Tuple[str, str, str, str]], batch_size: int = 1000) -> int:
+        """
+        Replace the whole index with docs, given as (code, original_url, archived_at, text) tuples.
+
+        The new index is built in shadow tables and swapped in with one transaction, so
+        searches keep seeing the old index until then and a crash mid-build leaves it intact.
+        Archives added while the rebuild runs are carried over at the swap.
+        """
+        conn = self._conn()
+        self._drop_shadow(conn)
+        conn.executescript(_SCHEMA.format(**_SHADOW))
+        high_water = conn.execute("SELECT COALESCE(MAX(id), 0) FROM docs").fetchone()[0]
+        try:
+            count = 0
+            batch: List[Tuple[str, str, str, str]] = []
+            for doc in docs:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    count += self._add_batch(conn, batch)
+                    batch = []
+            count += self._add_batch(conn, batch)
+            with conn:
+                conn.execute("INSERT INTO docs_fts_new (docs_fts_new) VALUES ('optimize')")
+            self._swap(conn, high_water)
+        except BaseException:
+            self._drop_shadow(conn)
+            raise
+        return count
+
+    @staticmethod
+    def _drop_shadow(conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS docs_fts_new")
+        conn.execute("DROP TABLE IF EXISTS docs_new")
+        conn.commit()
+
+    def _swap(self, conn: sqlite3.Connection, high_water: int) -> None:
+        # Explicit BEGIN: sqlite3 would otherwise autocommit each DDL statement on its own.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = conn.execute(
+                """
+                SELECT d.code, d.original_url, d.archived_at, f.content
+                FROM docs d JOIN docs_fts f ON f.rowid = d.id
+                WHERE d.id > ? AND d.code NOT IN (SELECT code FROM docs_new)
+                """,
+                (high_water,),
+            ).fetchall()
+            for code, original_url, archived_at, text in added:
+                self._upsert(conn, code, original_url, archived_at, text, **_SHADOW)
+            conn.execute("DROP TABLE docs_fts")
+            conn.execute("DROP TABLE docs")
+            conn.execute("ALTER TABLE docs_new RENAME TO docs")
+            conn.execute("ALTER TABLE docs_fts_new RENAME TO docs_fts")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _add_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, str, str, str]]) -> int:
+        with conn:
+            for code, original_url, archived_at, text in batch:
+                self._upsert(conn, code, original_url, archived_at, text, **_SHADOW)
+        return len(batch)
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+# PUBLIC_INTERFACE
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI: `python -m src.api.search rebuild` re-indexes every existing archive."""
+    import argparse
+
+    from . import services
+
+    parser = argparse.ArgumentParser(prog="python -m src.api.search", description="Manage the archive search index.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    count = services.rebuild_search_index()
+    print(f"Indexed {count} archives into {services.SEARCH_DB}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,46 @@
 import hashlib
-import json
+import logging
 import os
 import re
 import secrets
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any
+from typing import TYPE_CHECKING, Optional, Tuple, Dict, Any, Iterator, List
+from urllib.parse import urljoin, urlsplit
 
-import httpx
-from bs4 import BeautifulSoup  # type: ignore
+from . import outbound, resolver, search, store
 
-# Local storage root (created automatically)
+# httpx and BeautifulSoup are imported where they are used so that importing this
+# module (OpenAPI generation, CLI tools, worker processes) stays cheap.
+if TYPE_CHECKING:
+    import httpx
+
+# Local storage root (created by init_storage)
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 ARCHIVE_DIR = DATA_DIR / "archives"
+RECORDS_DB = DATA_DIR / "records.db"
+SEARCH_DB = DATA_DIR / "search.db"
+# Pre-SQLite record index; imported into RECORDS_DB on first use
 INDEX_FILE = DATA_DIR / "index.json"
 
-# Ensure directories exist
-os.makedirs(ARCHIVE_DIR, exist_ok=True)
+# Diff summary reported when no comparison could be made
+NO_CHANGES = {"added": 0, "removed": 0, "changed": 0}
+
+_storage_ready: Optional[Path] = None
+_record_store: Optional[store.RecordStore] = None
+_search_index: Optional[search.SearchIndex] = None
+
+logger = logging.getLogger(__name__)
+
+
+# PUBLIC_INTERFACE
+def init_storage() -> None:
+    """Create the data directories if needed. Called at app startup; cheap and idempotent afterwards."""
+    global _storage_ready
+    if _storage_ready == ARCHIVE_DIR:
+        return
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    _storage_ready = ARCHIVE_DIR
 
 
 def _now_utc() -> datetime:
@@ -33,26 +57,26 @@ def get_base_url() -> str:
     return "http://localhost:8000"
 
 
-def _load_index() -> Dict[str, Any]:
-    if INDEX_FILE.exists():
-        with INDEX_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"by_code": {}, "by_id": {}}
-
-
-def _save_index(data: Dict[str, Any]) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with INDEX_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, default=str)
+# PUBLIC_INTERFACE
+def get_record_store() -> store.RecordStore:
+    """Record store backing every lookup, listing and export, stored at RECORDS_DB."""
+    global _record_store
+    if _record_store is None or _record_store.path != RECORDS_DB:
+        _record_store = store.RecordStore(RECORDS_DB, legacy_index=INDEX_FILE)
+    return _record_store
 
 
-def _safe_fetch(url: str, timeout: float = 10.0) -> Tuple[str, str]:
+def _safe_fetch(url: str, timeout: float = 10.0, client: Optional["httpx.Client"] = None) -> Tuple[str, str]:
     """
     Fetch a URL with safe settings:
     - Only http/https
-    - Limit redirects
+    - Host must resolve to public addresses only; connection pinned to the checked IP
+    - Limit redirects, re-checking every hop
     - Restrict content size
+    - Rate and concurrency limited per origin host (see outbound.OutboundScheduler)
+    Pass client to reuse pooled connections across fetches.
     Returns (content, content_type)
+    Raises outbound.OutboundRejected if the scheduler refuses the fetch.
     """
     if not re.match(r"^https?://", url, flags=re.IGNORECASE):
         raise ValueError("Only http/https URLs are allowed.")
@@ -61,10 +85,74 @@ def _safe_fetch(url: str, timeout: float = 10.0) -> Tuple[str, str]:
     if re.search(r"(?i)://(localhost|127\.0\.0\.1|::1|\[::1\])", url):
         raise ValueError("Localhost URLs are not allowed.")
 
-    max_bytes = 1_500_000  # 1.5 MB cap for archive content
+    # Resolve before queueing so unsafe targets fail fast; _http_get re-checks (from cache) per hop
+    host = urlsplit(url).hostname or ""
+    resolver.resolve_public(host)
+
+    with outbound.get_scheduler().slot(host):
+        if client is not None:
+            return _http_get(url, timeout, client)
+        with _new_client(timeout) as own_client:
+            return _http_get(url, timeout, own_client)
+
+
+def _new_client(timeout: float) -> "httpx.Client":
+    import httpx
+
+    return httpx.Client(timeout=timeout, limits=httpx.Limits(max_keepalive_connections=2))
+
+
+def _pinned_get(client: "httpx.Client", url: str, timeout: float) -> "httpx.Response":
+    """GET url at its validated addresses, moving on to the next one if a connection cannot be made."""
+    import httpx
+
+    def get(pinned_url: str, host_header: str, server_name: str) -> "httpx.Response":
+        return client.get(
+            pinned_url,
+            headers={"User-Agent": "SecureLinkArchive/1.0", "Host": host_header},
+            extensions={"sni_hostname": server_name},
+            timeout=timeout,
+            follow_redirects=False,
+        )
+
+    *fallbacks, last = resolver.pin_urls(url)
+    for attempt in fallbacks:
+        try:
+            return get(*attempt)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            continue
+    return get(*last)
+
 
-    with httpx.Client(follow_redirects=True, timeout=timeout, limits=httpx.Limits(max_keepalive_connections=2)) as client:
-        resp = client.get(url, headers={"User-Agent": "SecureLinkArchive/1.0"})
+def _http_get(url: str, timeout: float, client: "httpx.Client") -> Tuple[str, str]:
+    """
+    Perform the GET for _safe_fetch, following redirects manually, and apply the archive size cap.
+
+    _safe_fetch holds the outbound slot for url's own host for the whole call; each redirect
+    hop to another host takes a slot for that host too, so redirectors cannot be used to
+    reach an origin past its rate and concurrency limits.
+
+    client is only used for url's own hostname. Requests go to the pinned IP, so httpx pools
+    connections by IP alone: a redirect to another hostname on the same IP would otherwise
+    reuse a TLS connection whose certificate was checked for the first name. Hops to other
+    hostnames therefore get a fresh client of their own.
+    """
+    max_bytes = 1_500_000  # 1.5 MB cap for archive content
+    max_redirects = 5
+    client_host = (urlsplit(url).hostname or "").lower()
+
+    for _ in range(max_redirects + 1):
+        if not re.match(r"^https?://", url, flags=re.IGNORECASE):
+            raise ValueError("Only http/https URLs are allowed.")
+        hop_host = (urlsplit(url).hostname or "").lower()
+        if hop_host == client_host:
+            resp = _pinned_get(client, url, timeout)
+        else:
+            with outbound.get_scheduler().slot(hop_host), _new_client(timeout) as hop_client:
+                resp = _pinned_get(hop_client, url, timeout)
+        if resp.is_redirect:
+            url = urljoin(url, resp.headers["location"])
+            continue
         resp.raise_for_status()
         content_type = resp.headers.get("content-type", "text/html").split(";")[0].strip()
 
@@ -78,9 +166,13 @@ def _safe_fetch(url: str, timeout: float = 10.0) -> Tuple[str, str]:
 
         return content, content_type
 
+    raise ValueError("Too many redirects.")
+
 
 def _normalize_html(html: str) -> str:
     """Strip scripts/styles and normalize whitespace for diffing."""
+    from bs4 import BeautifulSoup  # type: ignore
+
     soup = BeautifulSoup(html, "html.parser")
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
@@ -114,12 +206,12 @@ def archive_url(url: str, note: Optional[str] = None) -> Dict[str, Any]:
     _id = hashlib.md5(f"{url}-{archived_at.isoformat()}".encode()).hexdigest()
 
     # Persist archive
+    init_storage()
     archive_file = ARCHIVE_DIR / f"{code}.txt"
     with archive_file.open("w", encoding="utf-8") as f:
         f.write(norm)
 
     # Update index
-    index = _load_index()
     rec = {
         "id": _id,
         "code": code,
@@ -129,9 +221,13 @@ def archive_url(url: str, note: Optional[str] = None) -> Dict[str, Any]:
         "content_type": content_type,
         "note": note,
     }
-    index["by_code"][code] = rec
-    index["by_id"][rec["id"]] = rec
-    _save_index(index)
+    get_record_store().put(rec)
+
+    try:
+        get_search_index().add(code, url, rec["archived_at"], norm)
+    except Exception:
+        # The archive itself is saved; `python -m src.api.search rebuild` brings the index back in line
+        logger.exception("Failed to index archive %s for search", code)
 
     return rec
 
@@ -139,15 +235,65 @@ def archive_url(url: str, note: Optional[str] = None) -> Dict[str, Any]:
 # PUBLIC_INTERFACE
 def get_record_by_code(code: str) -> Optional[Dict[str, Any]]:
     """Lookup an archive record by short code."""
-    index = _load_index()
-    return index["by_code"].get(code)
+    return get_record_store().get_by_code(code)
 
 
 # PUBLIC_INTERFACE
 def get_record_by_id(_id: str) -> Optional[Dict[str, Any]]:
     """Lookup an archive record by ID."""
-    index = _load_index()
-    return index["by_id"].get(_id)
+    return get_record_store().get_by_id(_id)
+
+
+# PUBLIC_INTERFACE
+def list_records(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    archived_after: Optional[datetime] = None,
+    archived_before: Optional[datetime] = None,
+    content_type: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of records ordered by archival time, optionally filtered.
+
+    Returns (records, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    after = store.decode_cursor(cursor) if cursor else None
+    rows = get_record_store().page(
+        limit + 1, after=after, archived_after=archived_after,
+        archived_before=archived_before, content_type=content_type,
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = store.encode_cursor(rows[-1]["archived_at"], rows[-1]["code"])
+    return rows, next_cursor
+
+
+# PUBLIC_INTERFACE
+def iter_records(
+    cursor: Optional[str] = None,
+    archived_after: Optional[datetime] = None,
+    archived_before: Optional[datetime] = None,
+    content_type: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Every matching record in archival order, streamed in fixed-size batches for exports.
+
+    Raises ValueError for a malformed cursor (checked before the first record is produced).
+    """
+    after = store.decode_cursor(cursor) if cursor else None
+    return get_record_store().iter_records(
+        after=after, archived_after=archived_after, archived_before=archived_before, content_type=content_type,
+    )
+
+
+def _read_archive(rec: Dict[str, Any]) -> Optional[str]:
+    """Archived normalized content for a record, or None if the file is gone."""
+    p = Path(rec["archive_file"])
+    if not p.exists():
+        return None
+    return p.read_text(encoding="utf-8")
 
 
 # PUBLIC_INTERFACE
@@ -156,10 +302,39 @@ def get_archived_content(code: str) -> Optional[str]:
     rec = get_record_by_code(code)
     if not rec:
         return None
-    p = Path(rec["archive_file"])
-    if not p.exists():
-        return None
-    return p.read_text(encoding="utf-8")
+    return _read_archive(rec)
+
+
+# PUBLIC_INTERFACE
+def get_search_index() -> search.SearchIndex:
+    """Full-text index over archived content, stored at SEARCH_DB."""
+    global _search_index
+    if _search_index is None or _search_index.path != SEARCH_DB:
+        _search_index = search.SearchIndex(SEARCH_DB)
+    return _search_index
+
+
+# PUBLIC_INTERFACE
+def search_archives(q: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Find archives whose content or URL matches q, best match first.
+
+    Returns (hits, next_offset); raises ValueError if q has no searchable words.
+    """
+    return get_search_index().search(q, limit=limit, offset=offset)
+
+
+# PUBLIC_INTERFACE
+def rebuild_search_index() -> int:
+    """Re-index every archive in the record store from its archive file; returns the number indexed."""
+
+    def docs():
+        for rec in get_record_store().iter_records():
+            p = Path(rec["archive_file"])
+            if p.exists():
+                yield rec["code"], rec["original_url"], rec["archived_at"], p.read_text(encoding="utf-8")
+
+    return get_search_index().rebuild(docs())
 
 
 # PUBLIC_INTERFACE
@@ -176,12 +351,27 @@ def compare_current_vs_archived(code: str) -> Tuple[bool, Dict[str, int], Dict[s
     if not rec:
         raise KeyError("Record not found")
 
-    archived = get_archived_content(code) or ""
+    archived = _read_archive(rec) or ""
     try:
         curr_raw, content_type = _safe_fetch(rec["original_url"])
-        current = _normalize_html(curr_raw) if content_type.startswith("text/html") else curr_raw
+        return normalize_and_diff(archived, curr_raw, content_type)
+    except outbound.OutboundRejected:
+        # Throttled by our own scheduler, not a fetch failure: let the caller surface 429/503
+        raise
     except Exception:
-        return False, {"added": 0, "removed": 0, "changed": 0}, {"changed_paths": [], "error": "fetch_failed"}
+        return False, dict(NO_CHANGES), {"changed_paths": [], "error": "fetch_failed"}
+
+
+# PUBLIC_INTERFACE
+def normalize_and_diff(archived: str, current_raw: str,
+                       content_type: str) -> Tuple[bool, Dict[str, int], Dict[str, Any]]:
+    """
+    Normalize freshly fetched content like archive_url does, then diff it line by line against archived.
+
+    Pure and top-level so batch comparisons can run it in worker processes.
+    Returns (has_changes, summary, details) as compare_current_vs_archived does.
+    """
+    current = _normalize_html(current_raw) if content_type.startswith("text/html") else current_raw
 
     archived_lines = archived.splitlines()
     current_lines = current.splitlines()
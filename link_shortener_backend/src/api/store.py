@@ -0,0 +1,182 @@
+"""
+SQLite-backed store for short link records.
+
+Replaces the single index.json file, which had to be loaded and rewritten whole on every
+lookup and shorten. Records are keyed by code, with secondary indexes on id and on
+(archived_at, code) so listings and exports page through with keyset cursors: each page
+is one bounded query, so memory stays flat however many records match. An existing
+index.json is imported on first use and renamed to index.json.migrated.
+"""
+import base64
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_COLUMNS = ("id", "code", "original_url", "archived_at", "archive_file", "content_type", "note")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    code TEXT PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    original_url TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    archive_file TEXT NOT NULL,
+    content_type TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS records_archived_at ON records (archived_at, code);
+CREATE INDEX IF NOT EXISTS records_type_archived_at ON records (content_type, archived_at, code);
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds.
+_MAX_PARAMS = 900
+
+
+# PUBLIC_INTERFACE
+def encode_cursor(archived_at: str, code: str) -> str:
+    """Opaque cursor pointing just after the record (archived_at, code)."""
+    raw = json.dumps([archived_at, code], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# PUBLIC_INTERFACE
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        archived_at, code = json.loads(raw)
+    except Exception as ex:
+        raise ValueError("Invalid cursor.") from ex
+    if not isinstance(archived_at, str) or not isinstance(code, str):
+        raise ValueError("Invalid cursor.")
+    return archived_at, code
+
+
+def _ts(value: datetime) -> str:
+    """Render a filter bound in the same UTC ISO format archived_at is stored in (naive means UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+# PUBLIC_INTERFACE
+class RecordStore:
+    """Short link records in SQLite; one connection per thread, WAL mode so readers never block on writers."""
+
+    def __init__(self, path: Path, legacy_index: Optional[Path] = None):
+        self.path = Path(path)
+        self.legacy_index = legacy_index
+        self._local = threading.local()
+        self._migrate_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._migrate_legacy(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate_legacy(self, conn: sqlite3.Connection) -> None:
+        if self.legacy_index is None:
+            return
+        with self._migrate_lock:
+            if not self.legacy_index.exists():
+                return
+            with self.legacy_index.open("r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            with conn:
+                self._insert(conn, legacy.get("by_code", {}).values(), replace=False)
+            self.legacy_index.rename(self.legacy_index.with_name(self.legacy_index.name + ".migrated"))
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]], replace: bool = True) -> None:
+        # ON CONFLICT (not OR IGNORE) so malformed records still fail loudly instead of vanishing
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        conflict = "" if replace else " ON CONFLICT (code) DO NOTHING"
+        conn.executemany(
+            f"{verb} INTO records ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}){conflict}",
+            ([rec.get(c) for c in _COLUMNS] for rec in records),
+        )
+
+    def put(self, rec: Dict[str, Any]) -> None:
+        """Insert or replace one record."""
+        conn = self._conn()
+        with conn:
+            self._insert(conn, [rec])
+
+    def get_by_code(self, code: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM records WHERE code = ?", (code,)).fetchone()
+        return dict(row) if row else None
+
+    def get_by_id(self, _id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM records WHERE id = ?", (_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Records for the given codes (missing codes are left out), in a handful of queries."""
+        conn = self._conn()
+        found: Dict[str, Dict[str, Any]] = {}
+        unique = list(dict.fromkeys(codes))
+        for i in range(0, len(unique), _MAX_PARAMS):
+            chunk = unique[i:i + _MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT * FROM records WHERE code IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((row["code"], dict(row)) for row in rows)
+        return found
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        archived_after: Optional[datetime] = None,
+        archived_before: Optional[datetime] = None,
+        content_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Up to limit records ordered by (archived_at, code), starting after the key `after`.
+
+        archived_after is inclusive, archived_before exclusive.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if after is not None:
+            clauses.append("(archived_at, code) > (?, ?)")
+            params.extend(after)
+        if archived_after is not None:
+            clauses.append("archived_at >= ?")
+            params.append(_ts(archived_after))
+        if archived_before is not None:
+            clauses.append("archived_at < ?")
+            params.append(_ts(archived_before))
+        if content_type is not None:
+            clauses.append("content_type = ?")
+            params.append(content_type)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT * FROM records {where} ORDER BY archived_at, code LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_records(self, batch_size: int = 500, after: Optional[Tuple[str, str]] = None,
+                     **filters: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every matching record in (archived_at, code) order, batch_size at a time.
+
+        Each batch is its own query, so the iterator may be advanced from different threads.
+        """
+        while True:
+            batch = self.page(batch_size, after=after, **filters)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1]["archived_at"], batch[-1]["code"])
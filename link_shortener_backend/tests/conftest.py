@@ -67,3 +67,10 @@ def ensure_header_routes(app):
     """Mark tests xfail if /api/header is not mounted."""
     if not _router_mounted(app, "/api/header"):
         pytest.xfail("header router not mounted (implementation files missing)")
+
+
+@pytest.fixture()
+def ensure_search_routes(app):
+    """Mark tests xfail if /api/search is not mounted."""
+    if not _router_mounted(app, "/api/search"):
+        pytest.xfail("search router not mounted (implementation files missing)")
@@ -0,0 +1,251 @@
+import importlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import compare_batch, outbound, services
+
+PAGE = "<html><body><p>{}</p><p>footer</p></body></html>"
+
+
+@pytest.fixture()
+def records(tmp_path, monkeypatch):
+    """Four archived links over two hosts in a temp record store."""
+    monkeypatch.setattr(services, "RECORDS_DB", tmp_path / "records.db")
+    monkeypatch.setattr(services, "INDEX_FILE", tmp_path / "index.json")
+    rs = services.get_record_store()
+    hosts = ["a.example", "a.example", "a.example", "b.example"]
+    for n, host in enumerate(hosts):
+        archive = tmp_path / f"code{n}.txt"
+        archive.write_text(f"page {n}\nfooter", encoding="utf-8")
+        rs.put({
+            "id": f"id{n}",
+            "code": f"code{n}",
+            "original_url": f"https://{host}/{n}",
+            "archived_at": datetime(2024, 1, 1 + n, tzinfo=timezone.utc).isoformat(),
+            "archive_file": str(archive),
+            "content_type": "text/plain" if n == 3 else "text/html",
+            "note": None,
+        })
+    return rs
+
+
+class FakeOrigin:
+    """Stands in for services._safe_fetch; page 1 has changed since archival, page 2 is down."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = {}
+
+    def __call__(self, url, timeout=10.0, client=None):
+        host = url.split("/")[2]
+        with self.lock:
+            self.clients.setdefault(host, set()).add(id(client))
+        n = int(url.rsplit("/", 1)[1])
+        if n == 2:
+            raise ValueError("connection refused")
+        if n == 3:
+            return "page 3\nfooter", "text/plain"
+        return PAGE.format("page 1 edited" if n == 1 else f"page {n}"), "text/html"
+
+
+def _by_code(items):
+    return {item["code"]: item for item in items}
+
+
+def test_batch_compares_codes_and_reuses_one_client_per_host(records):
+    origin = FakeOrigin()
+    with patch("src.api.services._safe_fetch", side_effect=origin):
+        items = _by_code(compare_batch.compare_batch(
+            codes=["code0", "code1", "code2", "code3", "nope", "code0"], use_processes=False,
+        ))
+
+    assert set(items) == {"code0", "code1", "code2", "code3", "nope"}
+    assert items["code0"]["has_changes"] is False and items["code0"]["error"] is None
+    assert items["code1"]["has_changes"] is True
+    assert items["code1"]["diff_summary"] == {"added": 0, "removed": 0, "changed": 1}
+    assert items["code1"]["changed_paths"] == ["line:1"]
+    assert items["code2"]["error"] == "fetch_failed"
+    assert items["code3"]["has_changes"] is False
+    assert items["nope"]["error"] == "not_found" and items["nope"]["id"] is None
+    assert {host: len(ids) for host, ids in origin.clients.items()} == {"a.example": 1, "b.example": 1}
+
+
+def test_bad_record_does_not_end_its_lane(records, tmp_path):
+    # More records on one host than lanes, so each lane has several; code0's archive is not UTF-8.
+    rs = services.get_record_store()
+    for n in range(4, 8):
+        archive = tmp_path / f"code{n}.txt"
+        archive.write_text(f"page {n}\nfooter", encoding="utf-8")
+        rs.put(dict(rs.get_by_code("code0"), id=f"id{n}", code=f"code{n}", original_url=f"https://a.example/{n}",
+                    archive_file=str(archive)))
+    (tmp_path / "code0.txt").write_bytes(b"\xff\xfe not utf-8")
+    codes = ["code0", "code1", "code4", "code5", "code6", "code7"]
+
+    with patch("src.api.services._safe_fetch", side_effect=FakeOrigin()):
+        items = _by_code(compare_batch.compare_batch(codes=codes, use_processes=False))
+    assert set(items) == set(codes)
+    assert items["code0"]["error"] == "compare_failed"
+    assert items["code7"]["error"] is None
+
+    with patch("src.api.services._safe_fetch", side_effect=FakeOrigin()), \
+         patch("src.api.compare_batch._compare_one", side_effect=RuntimeError("boom")):
+        items = _by_code(compare_batch.compare_batch(codes=codes, use_processes=False))
+    assert set(items) == set(codes)
+    assert {item["error"] for item in items.values()} == {"compare_failed"}
+
+
+def test_slow_host_does_not_hold_back_other_hosts(records, monkeypatch):
+    # a.example hangs until released; b.example's record, read after a.example's, must not wait for them.
+    monkeypatch.setattr(compare_batch, "MAX_PENDING", 4)
+    release = threading.Event()
+    origin = FakeOrigin()
+
+    def fetch(url, timeout=10.0, client=None):
+        if "a.example" in url:
+            release.wait(5)
+        return origin(url, timeout, client)
+
+    with patch("src.api.services._safe_fetch", side_effect=fetch):
+        results = compare_batch.compare_batch(codes=["code0", "code1", "code2", "code3"], use_processes=False)
+        first = next(results)
+        release.set()
+        rest = list(results)
+    assert first["code"] == "code3"
+    assert {item["code"] for item in rest} == {"code0", "code1", "code2"}
+
+
+def test_closing_early_does_not_wait_for_inflight_fetches(records):
+    release = threading.Event()
+    origin = FakeOrigin()
+    clients = []
+
+    def fetch(url, timeout=10.0, client=None):
+        clients.append(client)
+        if "a.example" in url:
+            release.wait(5)
+        return origin(url, timeout, client)
+
+    with patch("src.api.services._safe_fetch", side_effect=fetch):
+        results = compare_batch.compare_batch(codes=["code0", "code3"], use_processes=False)
+        assert next(results)["code"] == "code3"
+        started = time.monotonic()
+        results.close()
+        assert time.monotonic() - started < 1.0
+        release.set()
+        # The lane still fetching from a.example closes that host's client once it finishes.
+        deadline = time.monotonic() + 5
+        while not all(c.is_closed for c in clients) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert all(c.is_closed for c in clients)
+
+
+def test_batch_selects_by_filter(records):
+    with patch("src.api.services._safe_fetch", side_effect=FakeOrigin()):
+        items = _by_code(compare_batch.compare_batch(
+            content_type="text/html", archived_after=datetime(2024, 1, 2), use_processes=False,
+        ))
+    assert set(items) == {"code1", "code2"}
+
+
+def test_batch_reports_throttled_fetches(records):
+    rej = outbound.OutboundRejected("Too many pending fetches for a.example", 429)
+    with patch("src.api.services._safe_fetch", side_effect=rej):
+        items = list(compare_batch.compare_batch(codes=["code0"], use_processes=False))
+    assert items[0]["error"] == "throttled:429"
+
+
+def test_batch_parses_in_worker_processes(records, monkeypatch):
+    monkeypatch.setenv("COMPARE_PARSE_WORKERS", "1")
+    try:
+        with patch("src.api.services._safe_fetch", side_effect=FakeOrigin()):
+            items = _by_code(compare_batch.compare_batch(codes=["code0", "code1"]))
+    finally:
+        compare_batch.shutdown()
+    assert items["code0"]["has_changes"] is False
+    assert items["code1"]["has_changes"] is True
+
+
+def test_batch_replaces_parse_pool_after_worker_dies(records, monkeypatch):
+    monkeypatch.setenv("COMPARE_PARSE_WORKERS", "1")
+    try:
+        with patch("src.api.services._safe_fetch", side_effect=FakeOrigin()):
+            _by_code(compare_batch.compare_batch(codes=["code0"]))
+            broken = compare_batch._parse_pool
+            for proc in list(broken._processes.values()):
+                proc.kill()
+                proc.join(5)
+            items = _by_code(compare_batch.compare_batch(codes=["code0", "code1"]))
+        assert compare_batch._parse_pool is not None
+        assert compare_batch._parse_pool is not broken
+    finally:
+        compare_batch.shutdown()
+    assert [item["error"] for item in items.values()] == [None, None]
+    assert items["code0"]["has_changes"] is False
+    assert items["code1"]["has_changes"] is True
+
+
+def test_batch_concurrency_is_capped_below_global_limit(records, monkeypatch):
+    monkeypatch.setattr(outbound, "_scheduler", outbound.OutboundScheduler(max_global=8))
+    with patch("src.api.compare_batch._run", return_value=iter(())) as run:
+        list(compare_batch.compare_batch(codes=["code0"], concurrency=64, use_processes=False))
+        list(compare_batch.compare_batch(codes=["code0"], concurrency=2, use_processes=False))
+    assert [c.args[1] for c in run.call_args_list] == [4, 2]
+
+
+@pytest.mark.parametrize("name, value", [
+    ("COMPARE_BATCH_CONCURRENCY", "lots"),
+    ("COMPARE_BATCH_CONCURRENCY", "0"),
+    ("COMPARE_PARSE_WORKERS", "-1"),
+])
+def test_bad_env_config_fails_at_startup_not_import(app, monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+    importlib.reload(compare_batch)
+    with pytest.raises(RuntimeError, match=name):
+        with patch("src.api.services.init_storage"), TestClient(app):
+            pass
+
+
+@pytest.mark.usefixtures("ensure_compare_routes")
+def test_batch_endpoint_streams_ndjson(client):
+    results = [
+        {"id": "abc123", "code": "deadbeef", "has_changes": True, "diff_summary": {"added": 1, "removed": 0,
+         "changed": 0}, "changed_paths": [], "error": None},
+        {"id": None, "code": "missing1", "has_changes": False, "diff_summary": {"added": 0, "removed": 0,
+         "changed": 0}, "changed_paths": [], "error": "not_found"},
+    ]
+    with patch("src.api.compare_batch.compare_batch", return_value=(item for item in results)) as mock_batch:
+        resp = client.post("/api/compare/batch", json={"codes": ["deadbeef", "missing1"], "concurrency": 8})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["code"] for line in lines] == ["deadbeef", "missing1"]
+    assert lines[0]["has_changes"] is True
+    assert lines[1]["error"] == "not_found"
+    assert mock_batch.call_args.kwargs["codes"] == ["deadbeef", "missing1"]
+    assert mock_batch.call_args.kwargs["concurrency"] == 8
+
+
+@pytest.mark.usefixtures("ensure_compare_routes")
+def test_batch_endpoint_requires_codes_or_filter(client):
+    assert client.post("/api/compare/batch", json={}).status_code == 422
+    assert client.post("/api/compare/batch", json={"concurrency": 1000, "codes": ["a"]}).status_code == 422
+
+
+def test_cli_writes_ndjson_and_signals_changes(capsys):
+    results = [{"id": "abc123", "code": "deadbeef", "has_changes": True, "diff_summary": {}, "changed_paths": [],
+                "error": None}]
+    with patch("src.api.compare_batch.compare_batch", return_value=iter(results)) as mock_batch:
+        assert compare_batch.main(["deadbeef", "--concurrency", "4"]) == 1
+    assert json.loads(capsys.readouterr().out)["code"] == "deadbeef"
+    assert mock_batch.call_args.args[0] == ["deadbeef"]
+    assert mock_batch.call_args.kwargs["concurrency"] == 4
+
+    with pytest.raises(SystemExit):
+        compare_batch.main([])
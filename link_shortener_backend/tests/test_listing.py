@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.api import services, store
+
+
+def _rec(n, day, content_type="text/html"):
+    return {
+        "id": f"id{n}",
+        "code": f"code{n:04d}",
+        "original_url": f"https://example.org/{n}",
+        "archived_at": datetime(2024, 1, day, tzinfo=timezone.utc).isoformat(),
+        "archive_file": f"/tmp/archives/code{n:04d}.txt",
+        "content_type": content_type,
+        "note": None,
+    }
+
+
+@pytest.fixture()
+def records(tmp_path, monkeypatch):
+    """A record store at a temp path, wired into services, holding 10 records over 5 days."""
+    monkeypatch.setattr(services, "RECORDS_DB", tmp_path / "records.db")
+    monkeypatch.setattr(services, "INDEX_FILE", tmp_path / "index.json")
+    rs = services.get_record_store()
+    for n in range(10):
+        rs.put(_rec(n, 1 + n // 2, "text/plain" if n % 3 == 0 else "text/html"))
+    return rs
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = store.encode_cursor("2024-01-01T00:00:00+00:00", "abc")
+    assert store.decode_cursor(cursor) == ("2024-01-01T00:00:00+00:00", "abc")
+    for bad in ("not-a-cursor", store.encode_cursor("x", "y")[:-2] + "!!", "WzEsMl0"):
+        with pytest.raises(ValueError):
+            store.decode_cursor(bad)
+
+
+def test_lookups_by_code_id_and_batch(records):
+    assert services.get_record_by_code("code0003")["id"] == "id3"
+    assert services.get_record_by_id("id3")["code"] == "code0003"
+    assert services.get_record_by_code("missing") is None
+    assert set(records.get_many(["code0001", "code0002", "missing", "code0001"])) == {"code0001", "code0002"}
+
+
+def test_list_records_pages_through_everything_once(records):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = services.list_records(limit=3, cursor=cursor)
+        seen.extend(r["code"] for r in rows)
+        if cursor is None:
+            break
+    assert seen == [f"code{n:04d}" for n in range(10)]
+
+
+def test_list_records_filters(records):
+    rows, _ = services.list_records(
+        archived_after=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        archived_before=datetime(2024, 1, 4),
+        content_type="text/html",
+    )
+    assert [r["code"] for r in rows] == ["code0002", "code0004", "code0005"]
+
+
+def test_iter_records_streams_in_batches(records, monkeypatch):
+    limits = []
+    real_page = records.page
+    monkeypatch.setattr(records, "page", lambda limit, **kw: limits.append(limit) or real_page(limit, **kw))
+    codes = [r["code"] for r in records.iter_records(batch_size=4)]
+    assert codes == [f"code{n:04d}" for n in range(10)]
+    assert limits == [4, 4, 4]
+
+
+def test_legacy_index_is_migrated(tmp_path):
+    legacy = tmp_path / "index.json"
+    rec = _rec(1, 1)
+    legacy.write_text(json.dumps({"by_code": {rec["code"]: rec}, "by_id": {rec["id"]: rec}}), encoding="utf-8")
+    rs = store.RecordStore(tmp_path / "records.db", legacy_index=legacy)
+    assert rs.get_by_code(rec["code"])["original_url"] == rec["original_url"]
+    assert not legacy.exists()
+    assert (tmp_path / "index.json.migrated").exists()
+
+
+@pytest.mark.usefixtures("ensure_shorten_routes")
+def test_list_endpoint_paginates_with_cursor(client, records, monkeypatch):
+    monkeypatch.setenv("BACKEND_BASE_URL", "http://api.example.com")
+    resp = client.get("/api/urls", params={"limit": 4, "content_type": "text/html"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [item["code"] for item in data["items"]] == ["code0001", "code0002", "code0004", "code0005"]
+    assert data["items"][0]["short_url"] == "http://api.example.com/r/code0001"
+    assert "archive_file" not in data["items"][0]
+
+    resp = client.get("/api/urls", params={"limit": 4, "content_type": "text/html", "cursor": data["next_cursor"]})
+    data = resp.json()
+    assert [item["code"] for item in data["items"]] == ["code0007", "code0008"]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.usefixtures("ensure_shorten_routes")
+def test_list_endpoint_ndjson_export(client, records):
+    resp = client.get("/api/urls", params={"format": "ndjson", "archived_after": "2024-01-04T00:00:00Z"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["code"] for line in lines] == ["code0006", "code0007", "code0008", "code0009"]
+
+
+@pytest.mark.usefixtures("ensure_shorten_routes")
+def test_list_endpoint_rejects_bad_cursor(client, records):
+    assert client.get("/api/urls", params={"cursor": "garbage"}).status_code == 400
+    assert client.get("/api/urls", params={"cursor": "garbage", "format": "ndjson"}).status_code == 400
@@ -0,0 +1,85 @@
+import random
+import threading
+
+import httpx
+import pytest
+
+from src.api import loadtest
+
+
+def test_parse_mix_normalizes_weights():
+    mix = loadtest.parse_mix("shorten=1,redirect=3")
+    assert mix["shorten"] == pytest.approx(0.25)
+    assert mix["redirect"] == pytest.approx(0.75)
+    assert mix["compare"] == 0.0
+    assert mix["header"] == 0.0
+
+
+@pytest.mark.parametrize("spec", ["bogus=1", "redirect", "redirect=0", "redirect=-1"])
+def test_parse_mix_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        loadtest.parse_mix(spec)
+
+
+def test_zipf_sampler_favours_low_ranks():
+    sampler = loadtest.ZipfSampler(100, s=1.2, rng=random.Random(7))
+    counts = [0] * 100
+    for _ in range(5000):
+        counts[sampler.sample()] += 1
+    assert counts[0] > counts[1] > counts[10]
+    assert counts[0] > 5000 * 0.15
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert loadtest.percentile(values, 50) == 50.0
+    assert loadtest.percentile(values, 99) == 99.0
+    assert loadtest.percentile([], 95) == 0.0
+
+
+def test_find_saturation_on_plateau_and_errors():
+    levels = [
+        {"concurrency": 1, "throughput_rps": 100.0, "error_rate": 0.0},
+        {"concurrency": 4, "throughput_rps": 380.0, "error_rate": 0.0},
+        {"concurrency": 16, "throughput_rps": 400.0, "error_rate": 0.0},
+    ]
+    assert loadtest.find_saturation(levels) == {"concurrency": 4, "reason": "throughput_plateau"}
+
+    levels[1]["error_rate"] = 0.05
+    assert loadtest.find_saturation(levels) == {"concurrency": 4, "reason": "error_rate"}
+
+    assert loadtest.find_saturation(levels[:1]) is None
+
+
+def test_in_process_run_reports_levels(capsys):
+    report = loadtest.main([
+        "--levels", "1,2", "--duration", "0.2", "--codes", "1",
+        "--mix", "redirect=3,header=1", "--origin-latency-ms", "0", "--quiet", "--seed", "1",
+    ])
+    assert report["mode"] == "asgi"
+    assert report["codes"] == 1
+    assert [lv["concurrency"] for lv in report["levels"]] == [1, 2]
+    for level in report["levels"]:
+        assert level["requests"] > 0
+        assert level["error_rate"] == 0.0
+        assert set(level["operations"]) <= {"redirect", "header"}
+    assert "saturation:" in capsys.readouterr().out
+
+
+def test_expand_origins():
+    assert loadtest.expand_origins(["http://a.example", "http://s{}.example:8080/"], 3) == [
+        "http://a.example", "http://s0.example:8080/", "http://s1.example:8080/", "http://s2.example:8080/",
+    ]
+
+
+def test_origin_server_serves_stub_pages():
+    server = loadtest.make_origin_server(("127.0.0.1", 0), latency_ms=0, change_rate=0.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        resp = httpx.get(f"http://127.0.0.1:{server.server_address[1]}/page/7", headers={"Host": "site3.example"})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/html")
+    assert "http://site3.example/page/7 paragraph 0" in resp.text
@@ -0,0 +1,186 @@
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import outbound, resolver, services
+
+
+def _hold_slots(scheduler, host, count):
+    """Occupy count slots for host on background threads; returns (release_event, threads)."""
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+
+    def hold():
+        with scheduler.slot(host):
+            entered.release()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for _ in range(count):
+        assert entered.acquire(timeout=5)
+    return release, threads
+
+
+def test_token_bucket_allows_burst_then_rate_limits():
+    sched = outbound.OutboundScheduler(rate_per_host=1000.0, burst_per_host=2, max_wait=1.0)
+    for _ in range(2):
+        with sched.slot("example.org"):
+            pass
+    state = sched.snapshot()["hosts"]["example.org"]
+    assert state["completed"] == 2
+    assert state["tokens"] < 1.5
+
+    slow = outbound.OutboundScheduler(rate_per_host=0.5, burst_per_host=1, max_wait=0.05)
+    with slow.slot("example.org"):
+        pass
+    with pytest.raises(outbound.OutboundRejected) as exc:
+        with slow.slot("example.org"):
+            pass
+    assert exc.value.status_code == 503
+
+
+def test_per_host_concurrency_cap_does_not_block_other_hosts():
+    sched = outbound.OutboundScheduler(rate_per_host=1000.0, burst_per_host=100, max_per_host=1, max_wait=0.05)
+    release, threads = _hold_slots(sched, "a.example", 1)
+    try:
+        with pytest.raises(outbound.OutboundRejected):
+            with sched.slot("a.example"):
+                pass
+        with sched.slot("b.example"):
+            assert sched.snapshot()["active"] == 2
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
+    assert sched.snapshot()["active"] == 0
+
+
+def test_queue_bounds_fail_fast():
+    sched = outbound.OutboundScheduler(
+        rate_per_host=1000.0, burst_per_host=100, max_per_host=1, max_queue_per_host=0, max_wait=5.0
+    )
+    release, threads = _hold_slots(sched, "a.example", 1)
+    try:
+        started = time.monotonic()
+        with pytest.raises(outbound.OutboundRejected) as exc:
+            with sched.slot("a.example"):
+                pass
+        assert time.monotonic() - started < 1.0
+        assert exc.value.status_code == 429
+        assert exc.value.headers() == {"Retry-After": "1"}
+
+        sched.max_queue_per_host = 10
+        sched.max_queue_global = 0
+        with pytest.raises(outbound.OutboundRejected) as exc:
+            with sched.slot("a.example"):
+                pass
+        assert exc.value.status_code == 503
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
+    assert sched.snapshot()["rejected"] == 2
+    assert sched.snapshot()["hosts"]["a.example"]["rejected"] == 2
+
+
+def test_waiter_gets_slot_when_released():
+    sched = outbound.OutboundScheduler(rate_per_host=1000.0, burst_per_host=100, max_global=1, max_wait=5.0)
+    release, threads = _hold_slots(sched, "a.example", 1)
+    threading.Timer(0.05, release.set).start()
+    with sched.slot("b.example"):
+        pass
+    for t in threads:
+        t.join()
+    assert sched.snapshot()["hosts"]["b.example"]["completed"] == 1
+
+
+def test_redirect_hop_takes_a_slot_for_its_own_host(monkeypatch):
+    sched = outbound.OutboundScheduler(rate_per_host=1000.0, burst_per_host=100, max_per_host=1, max_wait=0.05)
+    monkeypatch.setattr(outbound, "_scheduler", sched)
+    monkeypatch.setattr(resolver, "_cache", resolver.DNSCache())
+    requested = []
+
+    def handler(request):
+        requested.append(request.headers["host"])
+        if request.headers["host"] == "short.example":
+            return httpx.Response(301, headers={"location": "https://origin.example/page"})
+        return httpx.Response(200, text="page")
+
+    def fetch():
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            return services._safe_fetch("https://short.example/abc", client=client)
+
+    with patch("src.api.resolver._lookup", return_value=(["93.184.216.34"], 60.0)), \
+         patch("src.api.services._new_client", side_effect=lambda timeout: httpx.Client(
+             transport=httpx.MockTransport(handler))):
+        release, threads = _hold_slots(sched, "origin.example", 1)
+        try:
+            with pytest.raises(outbound.OutboundRejected):
+                fetch()
+            assert requested == ["short.example"]
+        finally:
+            release.set()
+            for t in threads:
+                t.join()
+        assert fetch()[0] == "page"
+    assert sched.snapshot()["hosts"]["origin.example"]["completed"] == 2
+
+
+@pytest.mark.usefixtures("ensure_shorten_routes")
+def test_shorten_surfaces_scheduler_rejection(client):
+    rej = outbound.OutboundRejected("Too many pending fetches for example.org", 429, 0.2)
+    with patch("src.api.services.archive_url", side_effect=rej):
+        resp = client.post("/api/urls/shorten", json={"url": "https://example.org/a"})
+    assert resp.status_code == 429
+    assert resp.headers.get("retry-after") == "1"
+
+
+@pytest.mark.usefixtures("ensure_compare_routes")
+def test_compare_surfaces_scheduler_rejection(client):
+    rej = outbound.OutboundRejected("Outbound fetch queue is full", 503)
+    with patch("src.api.services.get_record_by_code", return_value={"id": "abc123", "code": "deadbeef"}), \
+         patch("src.api.services.compare_current_vs_archived", side_effect=rej):
+        resp = client.get("/api/compare/deadbeef")
+    assert resp.status_code == 503
+    assert resp.json()["detail"] == "Outbound fetch queue is full"
+
+
+def test_outbound_status_endpoint(client):
+    resp = client.get("/health/outbound")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert {"limits", "active", "waiting", "rejected", "hosts"} <= set(data)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"rate_per_host": 0},
+    {"rate_per_host": -1.0},
+    {"burst_per_host": 0.5},
+    {"max_per_host": 0},
+    {"max_global": 0},
+    {"max_queue_per_host": -1},
+    {"max_queue_global": -1},
+    {"max_wait": -1.0},
+])
+def test_scheduler_rejects_nonsense_limits(kwargs):
+    with pytest.raises(ValueError):
+        outbound.OutboundScheduler(**kwargs)
+
+
+@pytest.mark.parametrize("name, value, message", [
+    ("OUTBOUND_RATE_PER_HOST", "0", "rate_per_host must be > 0"),
+    ("OUTBOUND_MAX_GLOBAL", "lots", "OUTBOUND_MAX_GLOBAL must be an integer"),
+    ("OUTBOUND_MAX_PER_HOST", "0", "OUTBOUND_MAX_PER_HOST must be an integer >= 1"),
+])
+def test_bad_env_config_fails_at_startup(app, monkeypatch, name, value, message):
+    monkeypatch.setenv(name, value)
+    monkeypatch.setattr(outbound, "_scheduler", None)
+    with pytest.raises(RuntimeError, match=message):
+        with patch("src.api.services.init_storage"), TestClient(app):
+            pass
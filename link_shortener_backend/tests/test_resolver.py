@@ -0,0 +1,216 @@
+import ipaddress
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.api import resolver, services
+
+PUBLIC_IP = "93.184.216.34"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    resolver.get_cache().clear()
+    yield
+    resolver.get_cache().clear()
+
+
+@pytest.mark.parametrize("addr, public", [
+    ("93.184.216.34", True),
+    ("2606:2800:220:1:248:1893:25c8:1946", True),
+    ("10.0.0.5", False),
+    ("172.16.3.4", False),
+    ("192.168.1.1", False),
+    ("127.0.0.1", False),
+    ("169.254.169.254", False),
+    ("100.64.0.1", False),
+    ("0.0.0.0", False),
+    ("224.0.0.1", False),
+    ("::1", False),
+    ("fe80::1", False),
+    ("fd00::1", False),
+    ("::ffff:10.0.0.1", False),
+    ("64:ff9b::a9fe:a9fe", False),
+    ("64:ff9b::5db8:d822", True),
+    ("64:ff9b:1::5db8:d822", False),
+    ("2002:7f00:1::1", False),
+    ("2002:5db8:d822::1", True),
+    ("::7f00:1", False),
+    ("::a9fe:a9fe", False),
+    ("::", False),
+])
+def test_is_public_address(addr, public):
+    assert resolver.is_public_address(ipaddress.ip_address(addr)) is public
+
+
+def test_resolve_uses_cache_until_ttl_expires():
+    calls = []
+
+    def lookup(host):
+        calls.append(host)
+        return [PUBLIC_IP], 60.0
+
+    with patch("src.api.resolver._lookup", side_effect=lookup), \
+         patch("src.api.resolver.time.monotonic", return_value=1000.0) as clock:
+        assert resolver.resolve_public("Example.org") == [ipaddress.ip_address(PUBLIC_IP)]
+        resolver.resolve_public("example.org.")
+        assert calls == ["example.org"]
+
+        clock.return_value = 1061.0
+        resolver.resolve_public("example.org")
+        assert len(calls) == 2
+    assert resolver.get_cache().stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_lookup():
+    gate = threading.Event()
+    calls = []
+
+    def lookup(host):
+        calls.append(host)
+        gate.wait(2)
+        return [PUBLIC_IP], 60.0
+
+    results = []
+    with patch("src.api.resolver._lookup", side_effect=lookup):
+        threads = [threading.Thread(target=lambda: results.append(resolver.resolve_public("example.org")))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        gate.set()
+        for t in threads:
+            t.join()
+    assert len(calls) == 1
+    assert len(results) == 5
+
+
+@pytest.mark.parametrize("answer", [["10.1.2.3"], [PUBLIC_IP, "127.0.0.1"], []])
+def test_resolve_rejects_non_public_answers(answer):
+    with patch("src.api.resolver._lookup", return_value=(answer, 60.0)):
+        with pytest.raises(resolver.UnsafeTarget):
+            resolver.resolve_public("internal.example.org")
+
+
+def test_ip_literals_skip_dns():
+    with patch("src.api.resolver._lookup") as lookup:
+        assert resolver.resolve_public(PUBLIC_IP) == [ipaddress.ip_address(PUBLIC_IP)]
+        with pytest.raises(resolver.UnsafeTarget):
+            resolver.resolve_public("[fe80::1]")
+    lookup.assert_not_called()
+
+
+def test_pin_url_targets_validated_address():
+    with patch("src.api.resolver._lookup", return_value=(["2606:2800:220:1:248:1893:25c8:1946"], 60.0)):
+        pinned, host_header, server_name = resolver.pin_url("https://example.org:8443/a/b?x=1#frag")
+    assert pinned == "https://[2606:2800:220:1:248:1893:25c8:1946]:8443/a/b?x=1"
+    assert host_header == "example.org:8443"
+    assert server_name == "example.org"
+
+
+def _fetch_with(handler, url):
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        return services._safe_fetch(url, client=client)
+
+
+def test_safe_fetch_connects_to_pinned_ip_with_original_host():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        return httpx.Response(200, text="<p>hi</p>", headers={"content-type": "text/html; charset=utf-8"})
+
+    with patch("src.api.resolver._lookup", return_value=([PUBLIC_IP], 60.0)):
+        content, content_type = _fetch_with(handler, "https://example.org/page")
+    assert content == "<p>hi</p>"
+    assert content_type == "text/html"
+    assert seen == [(PUBLIC_IP, "example.org", "example.org")]
+
+
+def test_safe_fetch_rechecks_every_redirect_hop():
+    def handler(request):
+        if request.headers["host"] == "example.org":
+            return httpx.Response(302, headers={"location": "http://metadata.internal/latest"})
+        return httpx.Response(200, text="secret")
+
+    answers = {"example.org": [PUBLIC_IP], "metadata.internal": ["169.254.169.254"]}
+    with patch("src.api.resolver._lookup", side_effect=lambda host: (answers[host], 60.0)):
+        with pytest.raises(resolver.UnsafeTarget):
+            _fetch_with(handler, "https://example.org/start")
+
+
+def test_redirect_to_other_hostname_does_not_reuse_client():
+    # Both names share one IP, so a shared client would pool them onto one TLS connection.
+    def handler(request):
+        if request.headers["host"] == "a.example":
+            return httpx.Response(302, headers={"location": "https://b.example/next"})
+        return httpx.Response(200, text="from b")
+
+    shared, fresh = [], []
+
+    def recording_client(log):
+        return httpx.Client(transport=httpx.MockTransport(lambda r: log.append(r.headers["host"]) or handler(r)))
+
+    with patch("src.api.resolver._lookup", return_value=([PUBLIC_IP], 60.0)), \
+         patch("src.api.services._new_client", side_effect=lambda timeout: recording_client(fresh)):
+        with recording_client(shared) as client:
+            content, _ = services._safe_fetch("https://a.example/start", client=client)
+    assert content == "from b"
+    assert shared == ["a.example"]
+    assert fresh == ["b.example"]
+
+
+def test_safe_fetch_tries_next_address_when_connect_fails():
+    second_ip = "93.184.216.35"
+    tried = []
+
+    def handler(request):
+        tried.append(request.url.host)
+        if request.url.host == PUBLIC_IP:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, text="up")
+
+    with patch("src.api.resolver._lookup", return_value=([PUBLIC_IP, second_ip], 60.0)):
+        content, _ = _fetch_with(handler, "https://example.org/page")
+    assert content == "up"
+    assert tried == [PUBLIC_IP, second_ip]
+
+    with patch("src.api.resolver._lookup", return_value=([PUBLIC_IP], 60.0)):
+        resolver.get_cache().clear()
+        with pytest.raises(httpx.ConnectError):
+            _fetch_with(handler, "https://example.org/page")
+
+
+class _Answer(list):
+    def __init__(self, addresses, ttl):
+        super().__init__(type("Rdata", (), {"address": a})() for a in addresses)
+        self.rrset = type("RRset", (), {"ttl": ttl})()
+
+
+@pytest.mark.parametrize("a_answer, expected", [([PUBLIC_IP], [PUBLIC_IP]), (None, None)])
+def test_lookup_tolerates_aaaa_failure_only_when_a_answered(a_answer, expected):
+    import dns.resolver
+
+    def resolve(self, host, rdtype):
+        if rdtype == "AAAA":
+            raise dns.resolver.NoNameservers()
+        if a_answer is None:
+            raise dns.resolver.NoAnswer()
+        return _Answer(a_answer, 30)
+
+    with patch("dns.resolver.Resolver.resolve", resolve):
+        if expected is None:
+            with pytest.raises(resolver.UnsafeTarget):
+                resolver._lookup("example.org")
+        else:
+            assert resolver._lookup("example.org") == (expected, 30.0)
+
+
+def test_safe_fetch_limits_redirects():
+    def handler(request):
+        return httpx.Response(301, headers={"location": "/again"})
+
+    with patch("src.api.resolver._lookup", return_value=([PUBLIC_IP], 60.0)):
+        with pytest.raises(ValueError, match="Too many redirects"):
+            _fetch_with(handler, "https://example.org/loop")
@@ -0,0 +1,146 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.api import search, services
+
+
+@pytest.fixture()
+def index(tmp_path):
+    return search.SearchIndex(tmp_path / "search.db")
+
+
+def test_build_match_query_quotes_terms():
+    assert search.build_match_query('climate OR "x" NEAR(y)') == '"climate" "OR" "x" "NEAR" "y"'
+    assert search.build_match_query("archiv* link") == '"archiv"* "link"'
+    assert search.build_match_query("ab* link") == '"ab" "link"'
+    with pytest.raises(ValueError):
+        search.build_match_query("  ** -- ")
+
+
+def test_search_ranks_and_paginates(index):
+    index.add("aaaa0001", "https://a.example/", "2024-01-01T00:00:00+00:00", "solar panels and solar power")
+    index.add("aaaa0002", "https://b.example/", "2024-01-02T00:00:00+00:00", "wind power only")
+    index.add("aaaa0003", "https://c.example/", "2024-01-03T00:00:00+00:00", "one mention of solar here")
+
+    hits, next_offset = index.search("solar", limit=1)
+    assert [h["code"] for h in hits] == ["aaaa0001"]
+    assert next_offset == 1
+    assert "[solar]" in hits[0]["snippet"]
+
+    hits, next_offset = index.search("solar", limit=1, offset=1)
+    assert [h["code"] for h in hits] == ["aaaa0003"]
+    assert next_offset is None
+
+    # Porter stemming: "powered" matches "power"
+    assert {h["code"] for h in index.search("powered")[0]} == {"aaaa0001", "aaaa0002"}
+    assert index.search("sol*")[0]
+    assert index.search("solar wind")[0] == []
+
+
+def test_common_terms_fall_back_to_newest_first(index, monkeypatch):
+    for n in range(4):
+        index.add(f"aaaa000{n}", "https://a.example/", f"2024-01-0{n + 1}T00:00:00+00:00",
+                  "solar " * (4 - n) + ("kestrel" if n == 1 else ""))
+    monkeypatch.setattr(search, "_MAX_RANKED_DF", 3)
+
+    hits, next_offset = index.search("solar", limit=3)
+    assert [h["code"] for h in hits] == ["aaaa0003", "aaaa0002", "aaaa0001"]
+    assert all(h["score"] is None for h in hits)
+    assert next_offset == 3
+    # One common term is enough to skip ranking, even when the other is rare
+    assert index.search("solar kestrel")[0][0]["score"] is None
+    assert index.search("kestrel")[0][0]["score"] > 0
+
+
+def test_add_replaces_existing_code(index):
+    index.add("aaaa0001", "https://a.example/", "2024-01-01T00:00:00+00:00", "old words")
+    index.add("aaaa0001", "https://a.example/", "2024-02-01T00:00:00+00:00", "new words")
+    assert index.count() == 1
+    assert index.search("old")[0] == []
+    assert index.search("new")[0][0]["archived_at"] == "2024-02-01T00:00:00+00:00"
+
+
+def _in_thread(fn):
+    """Run fn on another thread, which gets its own SQLite connection, and return its result."""
+    out = []
+    t = threading.Thread(target=lambda: out.append(fn()))
+    t.start()
+    t.join()
+    return out[0]
+
+
+def test_rebuild_swaps_in_atomically_and_keeps_concurrent_adds(index):
+    index.add("old00001", "https://a.example/", "2024-01-01T00:00:00+00:00", "kestrel nest")
+    seen_during = []
+
+    def docs():
+        yield "new00001", "https://b.example/", "2024-01-02T00:00:00+00:00", "kestrel flight"
+        seen_during.append(_in_thread(lambda: [h["code"] for h in index.search("kestrel")[0]]))
+        _in_thread(lambda: index.add("late0001", "https://c.example/", "2024-01-03T00:00:00+00:00", "kestrel late"))
+        yield "new00002", "https://b.example/", "2024-01-02T00:00:00+00:00", "falcon"
+
+    assert index.rebuild(docs(), batch_size=1) == 2
+    assert seen_during == [["old00001"]]
+    assert {h["code"] for h in index.search("kestrel")[0]} == {"new00001", "late0001"}
+    assert index.count() == 3
+
+
+def test_failed_rebuild_leaves_index_intact(index):
+    index.add("old00001", "https://a.example/", "2024-01-01T00:00:00+00:00", "kestrel nest")
+
+    def docs():
+        yield "new00001", "https://b.example/", "2024-01-02T00:00:00+00:00", "kestrel flight"
+        raise OSError("archive unreadable")
+
+    with pytest.raises(OSError):
+        index.rebuild(docs(), batch_size=1)
+    assert [h["code"] for h in index.search("kestrel")[0]] == ["old00001"]
+    tables = {r[0] for r in index._conn().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "docs_new" not in tables and "docs_fts_new" not in tables
+
+
+def test_rebuild_indexes_existing_archives(tmp_path, monkeypatch):
+    archive = tmp_path / "archives" / "aaaa0001.txt"
+    archive.parent.mkdir()
+    archive.write_text("archived kestrel sighting", encoding="utf-8")
+    records = {
+        "aaaa0001": {"id": "id1", "code": "aaaa0001", "original_url": "https://a.example/", "archived_at": "2024-01-01",
+                     "archive_file": str(archive)},
+        "aaaa0002": {"id": "id2", "code": "aaaa0002", "original_url": "https://b.example/", "archived_at": "2024-01-02",
+                     "archive_file": str(tmp_path / "archives" / "missing.txt")},
+    }
+    index_file = tmp_path / "index.json"
+    index_file.write_text(json.dumps({"by_code": records, "by_id": {}}), encoding="utf-8")
+    # Records come from the legacy index.json, imported into the record store on first use
+    monkeypatch.setattr(services, "INDEX_FILE", index_file)
+    monkeypatch.setattr(services, "RECORDS_DB", tmp_path / "records.db")
+    monkeypatch.setattr(services, "SEARCH_DB", tmp_path / "search.db")
+
+    services.get_search_index().add("stale001", "https://gone.example/", "2023-01-01", "kestrel")
+    assert services.rebuild_search_index() == 1
+    hits, _ = services.search_archives("kestrel")
+    assert [h["code"] for h in hits] == ["aaaa0001"]
+
+
+@pytest.mark.usefixtures("ensure_search_routes")
+def test_search_endpoint(client):
+    hits = [{"code": "deadbeef", "original_url": "https://example.org/a", "archived_at": "2024-01-01T00:00:00+00:00",
+             "snippet": "about [kestrels]", "score": 3.5}]
+    with patch("src.api.services.search_archives", return_value=(hits, 20)) as mock_search:
+        resp = client.get("/api/search", params={"q": "kestrels", "limit": 20})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["query"] == "kestrels"
+    assert data["hits"][0]["code"] == "deadbeef"
+    assert data["next_offset"] == 20
+    mock_search.assert_called_once_with("kestrels", limit=20, offset=0)
+
+
+@pytest.mark.usefixtures("ensure_search_routes")
+def test_search_endpoint_rejects_empty_query(client):
+    assert client.get("/api/search", params={"q": ""}).status_code == 422
+    with patch("src.api.services.search_archives", side_effect=ValueError("no words")):
+        assert client.get("/api/search", params={"q": "--"}).status_code == 400
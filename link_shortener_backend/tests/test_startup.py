@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import services
+
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+
+# Cold import budgets in seconds, measured in a fresh interpreter. Generous enough for a
+# loaded CI box; pulling httpx/bs4 back into services at import time blows the first one.
+SERVICES_IMPORT_BUDGET = 0.25
+MAIN_IMPORT_BUDGET = 1.5
+
+_PROBE = """
+import json, os, pathlib, sys, time
+made = []
+real_makedirs, real_mkdir = os.makedirs, pathlib.Path.mkdir
+os.makedirs = lambda *a, **k: made.append(str(a[0])) or real_makedirs(*a, **k)
+pathlib.Path.mkdir = lambda self, *a, **k: made.append(str(self)) or real_mkdir(self, *a, **k)
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = [m for m in ("httpx", "bs4", "dns") if m in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy, "made": made}}))
+"""
+
+
+def _probe_import(module):
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=BACKEND_ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module, budget", [
+    ("src.api.services", SERVICES_IMPORT_BUDGET),
+    ("src.api.main", MAIN_IMPORT_BUDGET),
+])
+def test_import_is_lazy_and_within_budget(module, budget):
+    # Best of three to keep a single slow cold start from failing the run.
+    results = [_probe_import(module) for _ in range(3)]
+    assert min(r["elapsed"] for r in results) < budget
+    for r in results:
+        assert r["heavy"] == []
+        assert r["made"] == []
+
+
+def test_init_storage_creates_archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(services, "ARCHIVE_DIR", tmp_path / "data" / "archives")
+    monkeypatch.setattr(services, "_storage_ready", None)
+    services.init_storage()
+    assert (tmp_path / "data" / "archives").is_dir()
+
+
+def test_app_lifespan_initializes_storage(app):
+    with patch("src.api.services.init_storage") as init:
+        with TestClient(app):
+            pass
+    init.assert_called_once_with()